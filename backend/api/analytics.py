@@ -0,0 +1,333 @@
+# backend/api/analytics.py
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from flask_sqlalchemy.session import Session
+
+from models import (
+    db, Episode, Color, Subject, episode_colors, episode_subjects,
+    analytics_cooccurrence, analytics_period_frequency, analytics_distribution,
+)
+
+# kind -> (row item, column item); same-item kinds are symmetric
+COOCCURRENCE_KINDS = {
+    'color_color': ('color', 'color'),
+    'color_subject': ('color', 'subject'),
+    'subject_subject': ('subject', 'subject'),
+}
+PERIODS = ('season', 'year')
+DISTRIBUTION_KINDS = ('num_colors', 'colors_per_episode', 'subjects_per_episode')
+TIMELINE_BUCKETS = ('month', 'year')
+
+ITEM_MODELS = {'color': Color, 'subject': Subject}
+TABLES = (analytics_cooccurrence, analytics_period_frequency, analytics_distribution)
+
+
+# ===== Incremental maintenance =====
+# The ETL materializes the tables in bulk (run_etl.compute_analytics). Here every
+# flush turns the episodes it touches into +1/-1 contributions, which are upserted
+# in the same transaction so the tables never drift from the junction tables.
+
+def _year(air_date):
+    if isinstance(air_date, date):
+        return air_date.year
+    if isinstance(air_date, str) and air_date:
+        return int(air_date[:4])
+    return None
+
+
+def add_contribution(delta, season, air_date, num_colors, color_ids, subject_ids, sign):
+    """Add (sign=1) or remove (sign=-1) one episode's counts to `delta`."""
+    colors = sorted(set(color_ids))
+    subjects = sorted(set(subject_ids))
+
+    cooccurrence = delta[analytics_cooccurrence]
+    for i, a in enumerate(colors):
+        for b in colors[i:]:
+            cooccurrence[('color_color', a, b)] += sign
+        for s in subjects:
+            cooccurrence[('color_subject', a, s)] += sign
+    for i, a in enumerate(subjects):
+        for b in subjects[i:]:
+            cooccurrence[('subject_subject', a, b)] += sign
+
+    frequency = delta[analytics_period_frequency]
+    for period, value in (('season', season), ('year', _year(air_date))):
+        if value is None:
+            continue
+        for c in colors:
+            frequency[(period, value, 'color', c)] += sign
+        for s in subjects:
+            frequency[(period, value, 'subject', s)] += sign
+        frequency[(period, value, 'episode', 0)] += sign
+        frequency[(period, value, 'num_colors', 0)] += sign * (num_colors or 0)
+
+    distribution = delta[analytics_distribution]
+    if num_colors is not None:
+        distribution[('num_colors', num_colors)] += sign
+    distribution[('colors_per_episode', len(colors))] += sign
+    distribution[('subjects_per_episode', len(subjects))] += sign
+
+
+def episode_state(ep, old=False):
+    """An episode's (season, air_date, num_colors, color_ids, subject_ids) before or after the flush."""
+    state = sa.inspect(ep)
+
+    def values(attr):
+        history = state.attrs[attr].load_history()
+        return list(history.unchanged) + list(history.deleted if old else history.added)
+
+    def scalar(attr):
+        vals = values(attr)
+        return vals[0] if vals else None
+
+    return (
+        scalar('season'), scalar('air_date'), scalar('num_colors'),
+        [c.id for c in values('colors') if c.id is not None],
+        [s.id for s in values('subjects') if s.id is not None],
+    )
+
+
+def collect_delta(session):
+    delta = {table: defaultdict(int) for table in TABLES}
+    for obj in session.new:
+        if isinstance(obj, Episode):
+            add_contribution(delta, *episode_state(obj), sign=1)
+    for obj in session.dirty:
+        if isinstance(obj, Episode) and session.is_modified(obj):
+            add_contribution(delta, *episode_state(obj, old=True), sign=-1)
+            add_contribution(delta, *episode_state(obj), sign=1)
+    for obj in session.deleted:
+        if isinstance(obj, Episode):
+            add_contribution(delta, *episode_state(obj, old=True), sign=-1)
+        elif isinstance(obj, (Color, Subject)):
+            # Deleting a color/subject unlinks it from every episode that used it
+            index = 3 if isinstance(obj, Color) else 4
+            for ep in obj.episodes:
+                if ep in session.deleted:
+                    continue
+                before = episode_state(ep, old=True)
+                after = list(before)
+                after[index] = [i for i in before[index] if i != obj.id]
+                add_contribution(delta, *before, sign=-1)
+                add_contribution(delta, *after, sign=1)
+    return delta
+
+
+def _upsert(table, dialect):
+    keys = [c.name for c in table.primary_key]
+    if dialect == 'mysql':
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update(count=table.c['count'] + stmt.inserted['count'])
+    module = {'sqlite': sqlite, 'postgresql': postgresql}.get(dialect)
+    if module is None:
+        raise NotImplementedError(f"analytics upsert is not supported on {dialect}")
+    stmt = module.insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=keys, set_={'count': table.c['count'] + stmt.excluded['count']}
+    )
+
+
+def apply_delta(session, delta):
+    for table, changes in delta.items():
+        keys = [c.name for c in table.primary_key]
+        rows = [dict(zip(keys, key), count=n) for key, n in changes.items() if n]
+        if not rows:
+            continue
+        stmt = table.insert()
+        dialect = session.get_bind(clause=stmt).dialect.name
+        session.execute(_upsert(table, dialect), rows)
+        session.execute(table.delete().where(table.c['count'] <= 0))
+
+
+def init_analytics():
+    """Keep the materialized analytics current on every ORM write."""
+
+    @sa.event.listens_for(Session, 'before_flush')
+    def on_before_flush(session, flush_context, instances):
+        session.info['analytics_delta'] = collect_delta(session)
+
+    @sa.event.listens_for(Session, 'after_flush')
+    def on_after_flush(session, flush_context):
+        delta = session.info.pop('analytics_delta', None)
+        if delta:
+            apply_delta(session, delta)
+
+
+# ===== Read side =====
+
+def _items(kind):
+    model = ITEM_MODELS[kind]
+    rows = db.session.execute(sa.select(model.id, model.name).order_by(model.id)).all()
+    return np.array([r.id for r in rows], dtype=np.int64), [r.name for r in rows]
+
+
+def cooccurrence(kind):
+    """Dense co-occurrence matrix with row/column ids and labels, or None for an unknown kind."""
+    if kind not in COOCCURRENCE_KINDS:
+        return None
+    row_kind, col_kind = COOCCURRENCE_KINDS[kind]
+    row_ids, row_labels = _items(row_kind)
+    col_ids, col_labels = _items(col_kind)
+
+    t = analytics_cooccurrence
+    cells = db.session.execute(
+        sa.select(t.c.a_id, t.c.b_id, t.c['count']).where(t.c.kind == kind)
+    ).all()
+    counts = np.zeros((len(row_ids), len(col_ids)), dtype=np.int64)
+    if cells:
+        a, b, n = (np.array(col, dtype=np.int64) for col in zip(*cells))
+        rows, cols = np.searchsorted(row_ids, a), np.searchsorted(col_ids, b)
+        # Drop cells whose color/subject no longer exists
+        keep = (rows < len(row_ids)) & (cols < len(col_ids))
+        keep[keep] &= (row_ids[rows[keep]] == a[keep]) & (col_ids[cols[keep]] == b[keep])
+        counts[rows[keep], cols[keep]] = n[keep]
+    if row_kind == col_kind:
+        # Only the upper triangle is stored
+        counts = counts + np.triu(counts, 1).T
+
+    return {
+        'kind': kind,
+        'row_ids': row_ids.tolist(),
+        'col_ids': col_ids.tolist(),
+        'row_labels': row_labels,
+        'col_labels': col_labels,
+        'counts': counts.tolist(),
+    }
+
+
+def period_frequency(period):
+    """Per season/year episode counts, average num_colors and color/subject frequencies."""
+    if period not in PERIODS:
+        return None
+    names = {kind: dict(zip(*_items(kind))) for kind in ITEM_MODELS}
+
+    t = analytics_period_frequency
+    rows = db.session.execute(
+        sa.select(t.c.period_value, t.c.item_kind, t.c.item_id, t.c['count'])
+        .where(t.c.period == period)
+        # Primary key order, so the rows stream from the index without a sort
+        .order_by(t.c.period_value, t.c.item_kind, t.c.item_id)
+    ).all()
+
+    buckets = {}
+    num_colors_total = defaultdict(int)
+    for value, item_kind, item_id, count in rows:
+        bucket = buckets.setdefault(value, {
+            'period': value, 'episodes': 0, 'avg_num_colors': None, 'colors': [], 'subjects': [],
+        })
+        if item_kind == 'episode':
+            bucket['episodes'] = count
+        elif item_kind == 'num_colors':
+            num_colors_total[value] = count
+        elif item_id in names[item_kind]:
+            bucket[f'{item_kind}s'].append({'id': item_id, 'name': names[item_kind][item_id], 'count': count})
+
+    result = []
+    for value, bucket in buckets.items():
+        if bucket['episodes']:
+            bucket['avg_num_colors'] = num_colors_total[value] / bucket['episodes']
+        for kind in ('colors', 'subjects'):
+            bucket[kind].sort(key=lambda item: (-item['count'], item['id']))
+        result.append(bucket)
+    return result
+
+
+def distributions():
+    """Histograms of num_colors and of colors/subjects linked per episode."""
+    t = analytics_distribution
+    rows = db.session.execute(
+        sa.select(t.c.kind, t.c.value, t.c['count']).order_by(t.c.kind, t.c.value)
+    ).all()
+    buckets = {kind: [] for kind in DISTRIBUTION_KINDS}
+    for kind, value, count in rows:
+        buckets.setdefault(kind, []).append({'value': value, 'count': count})
+    return [{'kind': kind, 'buckets': values} for kind, values in buckets.items()]
+
+
+# ===== Timeline =====
+# Not materialized: episodes are counted per air date over the idx_episodes_air_date
+# range, and the (air_date, item) links are read through the junction primary keys
+# and counted here. Episodes rarely share an air date, so grouping the links in SQL
+# would sort every row without reducing the result.
+
+def _timeline_counts(aired_after, aired_before):
+    """[(air_date, item_kind, item_id, count)] grouped by air date."""
+
+    def dated(stmt):
+        stmt = stmt.where(Episode.air_date.is_not(None))
+        if aired_after:
+            stmt = stmt.where(Episode.air_date >= aired_after)
+        if aired_before:
+            stmt = stmt.where(Episode.air_date <= aired_before)
+        return stmt
+
+    episodes = dated(sa.select(Episode.air_date, sa.func.count()).group_by(Episode.air_date))
+    counts = [(air_date, 'episode', 0, n) for air_date, n in db.session.execute(episodes)]
+    for kind, table, column in (
+        ('color', episode_colors, episode_colors.c.color_id),
+        ('subject', episode_subjects, episode_subjects.c.subject_id),
+    ):
+        links = dated(sa.select(Episode.air_date, column).join(table, table.c.episode_id == Episode.id))
+        counts.extend((air_date, kind, item_id, 1) for air_date, item_id in db.session.execute(links))
+    return counts
+
+
+def _timeline_counts_from_read_model(read_model, aired_after, aired_before):
+    counts = defaultdict(int)
+    for i in read_model.filter_episodes(aired_after=aired_after, aired_before=aired_before):
+        air_date = read_model.air_date_of(i)
+        if air_date is None:
+            continue
+        counts[(air_date, 'episode', 0)] += 1
+        for kind, ids, indptr, indices in (
+            ('color', read_model.color_id, read_model.episode_colors_indptr, read_model.episode_colors_indices),
+            ('subject', read_model.subject_id, read_model.episode_subjects_indptr, read_model.episode_subjects_indices),
+        ):
+            for j in indices[indptr[i]:indptr[i + 1]]:
+                counts[(air_date, kind, int(ids[j]))] += 1
+    return [key + (n,) for key, n in counts.items()]
+
+
+def timeline(bucket, aired_after=None, aired_before=None, top=5, read_model=None):
+    """
+    Episode counts and the `top` most used colors and subjects per month or
+    year of air date (both bounds inclusive), or None for an unknown bucket.
+    """
+    if bucket not in TIMELINE_BUCKETS:
+        return None
+    if read_model is not None:
+        counts = _timeline_counts_from_read_model(read_model, aired_after, aired_before)
+        names = {
+            'color': {c['id']: c['name'] for c in read_model.all_colors()},
+            'subject': {s['id']: s['name'] for s in read_model.all_subjects()},
+        }
+    else:
+        counts = _timeline_counts(aired_after, aired_before)
+        names = {kind: dict(zip(*_items(kind))) for kind in ITEM_MODELS}
+
+    buckets = {}
+    for air_date, item_kind, item_id, count in counts:
+        key = f"{air_date.year:04d}" if bucket == 'year' else f"{air_date.year:04d}-{air_date.month:02d}"
+        entry = buckets.setdefault(key, {'episodes': 0, 'color': defaultdict(int), 'subject': defaultdict(int)})
+        if item_kind == 'episode':
+            entry['episodes'] += count
+        elif item_id in names[item_kind]:
+            entry[item_kind][item_id] += count
+
+    def most_used(entry, kind):
+        ranked = sorted(entry[kind].items(), key=lambda item: (-item[1], item[0]))[:top]
+        return [{'id': item_id, 'name': names[kind][item_id], 'count': n} for item_id, n in ranked]
+
+    return [
+        {
+            'bucket': key,
+            'episodes': buckets[key]['episodes'],
+            'colors': most_used(buckets[key], 'color'),
+            'subjects': most_used(buckets[key], 'subject'),
+        }
+        for key in sorted(buckets)
+    ]
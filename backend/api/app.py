@@ -6,7 +6,7 @@ import jwt
 from functools import wraps
 import graphene
 from graphql_server.flask import GraphQLView
-from flask import Flask, jsonify, request
+from flask import Flask, Response, abort, jsonify, request, stream_with_context
 from flask_restful import Api, Resource
 from flask_cors import CORS
 from dotenv import load_dotenv
@@ -44,20 +44,49 @@ def get_current_user():
 # Models
 from models import db, Episode, Color, Subject
 
-# DB config
-db_user = os.getenv('DB_USER')
-db_password = os.getenv('DB_PASSWORD')
-db_host = os.getenv('DB_HOST')
-db_port = os.getenv('DB_PORT')
-db_name = os.getenv('DB_NAME')
-app.config['SQLALCHEMY_DATABASE_URI'] = (
-    f"mysql+mysqlconnector://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+from routing import init_routing, pool_metrics, probe_replicas, reset_pools, tune_snapshot_engine
+from columnar import load_columnar_snapshot
+import analytics
+import similarity
+import palette
+import changes
+import dto
+from batch import BATCH_AUTHENTICATED, batch_response
+from compress import init_compression
+from config import (
+    columnar_snapshot, engine_options, primary_database_uri, read_only_snapshot,
+    replica_binds, snapshot_database_uri
 )
+
+# DB config: writes go to the primary, reads to the replicas (if any).
+# With READ_ONLY_SNAPSHOT set, everything is served from the ETL's SQLite file.
+snapshot = read_only_snapshot()
+if snapshot:
+    app.config['SQLALCHEMY_DATABASE_URI'] = snapshot_database_uri(snapshot)
+    app.config['SQLALCHEMY_BINDS'] = {}
+else:
+    app.config['SQLALCHEMY_DATABASE_URI'] = primary_database_uri()
+    app.config['SQLALCHEMY_BINDS'] = replica_binds()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options('DB_POOL')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 
 # Bind the unbound db instance to the app
 db.init_app(app)
+if snapshot:
+    tune_snapshot_engine(app, db)
+
+# Columnar read model: memory-mapped at startup and shared by all workers.
+# Like the SQLite snapshot it is an ETL artifact, so writes are disabled.
+columnar_path = columnar_snapshot()
+read_model = load_columnar_snapshot(columnar_path) if columnar_path else None
+
+init_routing(app, db, read_only=bool(snapshot or read_model))
+analytics.init_analytics()
+changes.init_change_log()
+# After init_routing: the cache lookup reads the dataset version from the
+# database the request is routed to
+init_compression(app, lambda: changes.current_seq(read_model), lambda: token_error() is None)
 
 # Helper: convert a model instance to a plain dictionary
 def to_dict(model):
@@ -71,24 +100,148 @@ def to_dict(model):
             result[c.name] = value
     return result
 
+# Helpers for ranked results (similar episodes, palette search)
+MAX_RESULTS = 100
+
+def clamp_k(k, default=10):
+    return max(1, min(k or default, MAX_RESULTS))
+
+def with_episodes(ranked):
+    """
+    Turn [(episode_id, score)] into [(episode, score)] where the episode is an
+    ORM instance, or a read-model dict when the columnar snapshot is loaded.
+    """
+    if read_model is not None:
+        return [(read_model.episode_dict(read_model.episode_position(i)), score) for i, score in ranked]
+    episodes = {ep.id: ep for ep in Episode.query.filter(Episode.id.in_([i for i, _ in ranked]))}
+    return [(episodes[i], score) for i, score in ranked if i in episodes]
+
+def ranked_episode_dicts(ranked, score_key):
+    result = []
+    for ep, score in ranked:
+        ep_dict = dict(ep) if isinstance(ep, dict) else to_dict(ep)
+        ep_dict[score_key] = score
+        result.append(ep_dict)
+    return result
+
+def nearest_colors(hex_value, k):
+    """Ranked (color dict, distance) pairs for the colors closest to `hex_value`."""
+    ranked = palette.nearest_colors(hex_value, clamp_k(k, 5), read_model)
+    if read_model is not None:
+        colors = {c['id']: c for c in read_model.all_colors()}
+    else:
+        colors = {c.id: to_dict(c) for c in Color.query.filter(Color.id.in_([i for i, _ in ranked]))}
+    return [(colors[i], distance) for i, distance in ranked if i in colors]
+
+def find_similar(episode_id, k, metric):
+    """Ranked (episode, score) pairs, or None if the episode is unknown."""
+    ranked = similarity.similar_episodes(episode_id, clamp_k(k), metric, read_model)
+    return None if ranked is None else with_episodes(ranked)
+
+# Most change log entries returned per /api/changes call
+MAX_CHANGES = 1000
+
+# ===== Multi-get =====
+# Shared by the single-entity GETs, the ids= list filter and /api/batch, so an
+# entity has the same payload however it is fetched.
+MAX_IDS = 100
+
+def parse_ids(value):
+    """'3,1,2' -> [3, 1, 2] (request order, duplicates dropped), None if absent."""
+    if value is None:
+        return None
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise ValueError('ids must be a comma-separated list of integers')
+    if not 0 < len(ids) <= MAX_IDS:
+        raise ValueError(f'ids must list between 1 and {MAX_IDS} ids')
+    return ids
+
+def parse_air_dates(args):
+    """(aired_after, aired_before) as dates from the query string, None where absent."""
+    dates = []
+    for name in ('aired_after', 'aired_before'):
+        value = args.get(name)
+        try:
+            dates.append(date.fromisoformat(value) if value else None)
+        except ValueError:
+            # Ignoring it would widen the filter to the whole catalog
+            raise ValueError(f'{name} must be an ISO date (YYYY-MM-DD)')
+    return tuple(dates)
+
+def pick_ids(items, ids, get_id=lambda item: item['id']):
+    """The items whose id is in `ids`, in `ids` order (all items if ids is None)."""
+    if ids is None:
+        return list(items)
+    by_id = {get_id(item): item for item in items}
+    return [by_id[i] for i in ids if i in by_id]
+
+def load_episodes(ids):
+    """{id: episode dict} for the ids that exist, in one query."""
+    if read_model is not None:
+        positions = ((i, read_model.episode_position(i)) for i in ids)
+        return {i: read_model.episode_dict(pos) for i, pos in positions if pos is not None}
+    query = Episode.query.options(db.lazyload('*')).filter(Episode.id.in_(ids))
+    return {ep.id: to_dict(ep) for ep in query}
+
+def load_colors(ids):
+    """{id: color dict with its episodes}: one query for the colors, one for their episodes."""
+    if read_model is not None:
+        result = {}
+        for i in ids:
+            pos = read_model.color_position(i)
+            if pos is not None:
+                result[i] = read_model.color_dict(pos)
+                result[i]['episodes'] = [read_model.episode_dict(j) for j in read_model.episodes_for_color(pos)]
+        return result
+    query = Color.query.options(db.selectinload(Color.episodes).lazyload('*')).filter(Color.id.in_(ids))
+    return {c.id: dict(to_dict(c), episodes=[to_dict(ep) for ep in c.episodes]) for c in query}
+
+def load_subjects(ids):
+    """{id: subject dict with its episodes}: one query for the subjects, one for their episodes."""
+    if read_model is not None:
+        result = {}
+        for i in ids:
+            pos = read_model.subject_position(i)
+            if pos is not None:
+                result[i] = read_model.subject_dict(pos)
+                result[i]['episodes'] = [read_model.episode_dict(j) for j in read_model.episodes_for_subject(pos)]
+        return result
+    query = Subject.query.options(db.selectinload(Subject.episodes).lazyload('*')).filter(Subject.id.in_(ids))
+    return {s.id: dict(to_dict(s), episodes=[to_dict(ep) for ep in s.episodes]) for s in query}
+
 # ===== JWT Authentication =====
 
+def token_error():
+    """Why the request's JWT is rejected, or None if it is valid."""
+    token = None
+    auth_header = request.headers.get('Authorization', None)
+    if auth_header and auth_header.startswith('Bearer '):
+        token = auth_header.split(' ')[1]
+    if not token:
+        return 'Token is missing!'
+    try:
+        jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        return 'Token has expired!'
+    except Exception:
+        return 'Token is invalid!'
+    return None
+
 def token_required(f):
     """Decorator to protect routes with JWT authentication."""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        auth_header = request.headers.get('Authorization', None)
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-        if not token:
-            return jsonify({'message': 'Token is missing!'}), 401
-        try:
-            jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired!'}), 401
-        except Exception:
-            return jsonify({'message': 'Token is invalid!'}), 401
+        # Sub-requests of /api/batch run after the batch itself was authenticated.
+        # The mark lives in the sub-request's own environ: `g` belongs to the
+        # app context, which outlives a request when one is already pushed.
+        if request.environ.get(BATCH_AUTHENTICATED):
+            return f(*args, **kwargs)
+        error = token_error()
+        if error:
+            # A plain dict, so Flask-RESTful resources can serialize it too
+            return {'message': error}, 401
         return f(*args, **kwargs)
     return decorated
 
@@ -120,34 +273,34 @@ def login():
 class EpisodeListResource(Resource):
     @token_required
     def get(self):
-        query = Episode.query
         # Optional query parameters (for filtering)
         color_id = request.args.get('color_id', type=int)
         subject_id = request.args.get('subject_id', type=int)
         season = request.args.get('season', type=int)
         episode_num = request.args.get('episode', type=int)
         title_like = request.args.get('title', type=str)
-
-        # Apply filters
-        if color_id:
-            query = query.join(Episode.colors).filter(Color.id == color_id)
-        if subject_id:
-            query = query.join(Episode.subjects).filter(Subject.id == subject_id)
-        if season:
-            query = query.filter(Episode.season == season)
-        if episode_num:
-            query = query.filter(Episode.episode == episode_num)
-        if title_like:
-            query = query.filter(Episode.title.ilike(f"%{title_like}%"))
-
-        episodes = query.all()
-        result = []
-        for ep in episodes:
-            ep_dict = to_dict(ep)
-            ep_dict['colors'] = [to_dict(c) for c in ep.colors]
-            ep_dict['subjects'] = [to_dict(s) for s in ep.subjects]
-            result.append(ep_dict)
-        return result, 200
+        try:
+            # ISO dates, both inclusive
+            aired_after, aired_before = parse_air_dates(request.args)
+            ids = parse_ids(request.args.get('ids'))
+        except ValueError as e:
+            return {'message': str(e)}, 400
+
+        if read_model is not None:
+            rows = read_model.filter_episodes(
+                color_id, subject_id, season, episode_num, title_like, aired_after, aired_before
+            )
+            rows = pick_ids(rows, ids, lambda i: int(read_model.episode_id[i]))
+            return [read_model.episode_dict(i, with_links=True) for i in rows], 200
+
+        # Read-only DTOs rather than ORM instances (see dto.py)
+        statement = dto.episode_select(
+            color_id, subject_id, season, episode_num, title_like, aired_after, aired_before
+        )
+        if ids:
+            statement = statement.where(Episode.id.in_(ids))
+        episodes = pick_ids(dto.episode_rows(statement), ids, lambda ep: ep.id)
+        return [dto.episode_dict(ep) for ep in episodes], 200
 
     @token_required
     def post(self):
@@ -160,8 +313,10 @@ class EpisodeListResource(Resource):
 class EpisodeResource(Resource):
     @token_required
     def get(self, episode_id):
-        ep = Episode.query.get_or_404(episode_id)
-        return to_dict(ep), 200
+        found = load_episodes([episode_id])
+        if episode_id not in found:
+            abort(404)
+        return found[episode_id], 200
 
     @token_required
     def put(self, episode_id):
@@ -182,11 +337,55 @@ class EpisodeResource(Resource):
         db.session.commit()
         return '', 204
 
+class TimelineResource(Resource):
+    @token_required
+    def get(self):
+        bucket = request.args.get('bucket', 'year', type=str)
+        try:
+            aired_after, aired_before = parse_air_dates(request.args)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        top = request.args.get('top', 5, type=int)
+        result = analytics.timeline(bucket, aired_after, aired_before, clamp_k(top, 5), read_model)
+        if result is None:
+            return {'message': f"bucket must be one of {', '.join(analytics.TIMELINE_BUCKETS)}"}, 400
+        return result, 200
+
+class SimilarEpisodesResource(Resource):
+    @token_required
+    def get(self, episode_id):
+        k = request.args.get('k', 10, type=int)
+        metric = request.args.get('metric', 'jaccard', type=str)
+        if metric not in similarity.METRICS:
+            return {'message': f"metric must be one of {', '.join(similarity.METRICS)}"}, 400
+        ranked = find_similar(episode_id, k, metric)
+        if ranked is None:
+            abort(404)
+        return ranked_episode_dicts(ranked, 'similarity'), 200
+
+class PaletteSearchResource(Resource):
+    @token_required
+    def get(self):
+        values = request.args.getlist('hex')
+        if len(values) > palette.MAX_PALETTE_COLORS:
+            return {'message': f'Provide at most {palette.MAX_PALETTE_COLORS} hex colors'}, 400
+        hexes = [palette.parse_hex(h) for h in values]
+        if not hexes or None in hexes:
+            return {'message': 'Provide one or more hex=RRGGBB colors'}, 400
+        k = request.args.get('k', 10, type=int)
+        ranked = with_episodes(palette.match_palette(hexes, clamp_k(k), read_model))
+        return ranked_episode_dicts(ranked, 'palette_distance'), 200
+
 class ColorListResource(Resource):
     @token_required
     def get(self):
-        colors = Color.query.all()
-        return [to_dict(c) for c in colors], 200
+        try:
+            ids = parse_ids(request.args.get('ids'))
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        if read_model is not None:
+            return pick_ids(read_model.all_colors(), ids), 200
+        return pick_ids([c._asdict() for c in dto.color_rows(ids)], ids), 200
 
     @token_required
     def post(self):
@@ -196,13 +395,22 @@ class ColorListResource(Resource):
         db.session.commit()
         return to_dict(color), 201
 
+class NearestColorResource(Resource):
+    @token_required
+    def get(self):
+        hex_value = palette.parse_hex(request.args.get('hex', type=str))
+        if hex_value is None:
+            return {'message': 'Provide a hex=RRGGBB color'}, 400
+        k = request.args.get('k', 5, type=int)
+        return [dict(color, distance=distance) for color, distance in nearest_colors(hex_value, k)], 200
+
 class ColorResource(Resource):
     @token_required
     def get(self, color_id):
-        color = Color.query.get_or_404(color_id)
-        color_dict = to_dict(color)
-        color_dict['episodes'] = [to_dict(ep) for ep in color.episodes]
-        return color_dict, 200
+        found = load_colors([color_id])
+        if color_id not in found:
+            abort(404)
+        return found[color_id], 200
 
     @token_required
     def put(self, color_id):
@@ -225,8 +433,13 @@ class ColorResource(Resource):
 class SubjectListResource(Resource):
     @token_required
     def get(self):
-        subjects = Subject.query.all()
-        return [to_dict(s) for s in subjects], 200
+        try:
+            ids = parse_ids(request.args.get('ids'))
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        if read_model is not None:
+            return pick_ids(read_model.all_subjects(), ids), 200
+        return pick_ids([s._asdict() for s in dto.subject_rows(ids)], ids), 200
 
     @token_required
     def post(self):
@@ -239,10 +452,10 @@ class SubjectListResource(Resource):
 class SubjectResource(Resource):
     @token_required
     def get(self, subject_id):
-        subject = Subject.query.get_or_404(subject_id)
-        subject_dict = to_dict(subject)
-        subject_dict['episodes'] = [to_dict(ep) for ep in subject.episodes]
-        return subject_dict, 200
+        found = load_subjects([subject_id])
+        if subject_id not in found:
+            abort(404)
+        return found[subject_id], 200
 
     @token_required
     def put(self, subject_id):
@@ -260,13 +473,49 @@ class SubjectResource(Resource):
         db.session.commit()
         return '', 204
 
+class CooccurrenceResource(Resource):
+    @token_required
+    def get(self, kind):
+        result = analytics.cooccurrence(kind)
+        if result is None:
+            return {'message': f"kind must be one of {', '.join(analytics.COOCCURRENCE_KINDS)}"}, 400
+        return result, 200
+
+class PeriodFrequencyResource(Resource):
+    @token_required
+    def get(self, period):
+        result = analytics.period_frequency(period)
+        if result is None:
+            return {'message': f"period must be one of {', '.join(analytics.PERIODS)}"}, 400
+        return result, 200
+
+class DistributionResource(Resource):
+    @token_required
+    def get(self):
+        return analytics.distributions(), 200
+
+class ChangesResource(Resource):
+    @token_required
+    def get(self):
+        since = request.args.get('since', 0, type=int)
+        limit = request.args.get('limit', 500, type=int)
+        return changes.changes_since(since, max(1, min(limit, MAX_CHANGES)), read_model), 200
+
 # Register REST endpoints
 api.add_resource(EpisodeListResource, '/api/episodes')
 api.add_resource(EpisodeResource, '/api/episodes/<int:episode_id>')
+api.add_resource(SimilarEpisodesResource, '/api/episodes/<int:episode_id>/similar')
+api.add_resource(TimelineResource, '/api/episodes/timeline')
+api.add_resource(PaletteSearchResource, '/api/episodes/palette')
 api.add_resource(ColorListResource, '/api/colors')
+api.add_resource(NearestColorResource, '/api/colors/nearest')
 api.add_resource(ColorResource, '/api/colors/<int:color_id>')
 api.add_resource(SubjectListResource, '/api/subjects')
 api.add_resource(SubjectResource, '/api/subjects/<int:subject_id>')
+api.add_resource(CooccurrenceResource, '/api/analytics/cooccurrence/<string:kind>')
+api.add_resource(PeriodFrequencyResource, '/api/analytics/frequency/<string:period>')
+api.add_resource(DistributionResource, '/api/analytics/distributions')
+api.add_resource(ChangesResource, '/api/changes')
 
 # ===== GraphQL Types =====
 
@@ -292,11 +541,74 @@ class EpisodeType(graphene.ObjectType):
     colors = graphene.List(lambda: ColorType)
     subjects = graphene.List(lambda: SubjectType)
 
+    # Episodes are ORM instances or dto.EpisodeRow tuples, or plain dicts when
+    # served from the read model
     def resolve_colors(self, info):
-        return self.colors
+        return self['colors'] if isinstance(self, dict) else self.colors
 
     def resolve_subjects(self, info):
-        return self.subjects
+        return self['subjects'] if isinstance(self, dict) else self.subjects
+
+class SimilarEpisodeType(graphene.ObjectType):
+    episode = graphene.Field(EpisodeType)
+    similarity = graphene.Float()
+
+class PaletteMatchType(graphene.ObjectType):
+    episode = graphene.Field(EpisodeType)
+    distance = graphene.Float()
+
+class ColorMatchType(graphene.ObjectType):
+    color = graphene.Field(ColorType)
+    distance = graphene.Float()
+
+# ===== GraphQL Analytics Types =====
+
+class ItemCountType(graphene.ObjectType):
+    id = graphene.Int()
+    name = graphene.String()
+    count = graphene.Int()
+
+class PeriodFrequencyType(graphene.ObjectType):
+    period = graphene.Int()
+    episodes = graphene.Int()
+    avg_num_colors = graphene.Float()
+    colors = graphene.List(ItemCountType)
+    subjects = graphene.List(ItemCountType)
+
+class TimelineBucketType(graphene.ObjectType):
+    bucket = graphene.String()
+    episodes = graphene.Int()
+    colors = graphene.List(ItemCountType)
+    subjects = graphene.List(ItemCountType)
+
+class CooccurrenceType(graphene.ObjectType):
+    kind = graphene.String()
+    row_ids = graphene.List(graphene.Int)
+    col_ids = graphene.List(graphene.Int)
+    row_labels = graphene.List(graphene.String)
+    col_labels = graphene.List(graphene.String)
+    counts = graphene.List(graphene.List(graphene.Int))
+
+class BucketCountType(graphene.ObjectType):
+    value = graphene.Int()
+    count = graphene.Int()
+
+class DistributionType(graphene.ObjectType):
+    kind = graphene.String()
+    buckets = graphene.List(BucketCountType)
+
+class ChangeType(graphene.ObjectType):
+    # Same range as the BIGINT seq column
+    seq = graphene.BigInt()
+    entity = graphene.String()
+    id = graphene.Int()
+    op = graphene.String()
+    changed_at = graphene.String()
+
+class ChangeFeedType(graphene.ObjectType):
+    changes = graphene.List(ChangeType)
+    last_seq = graphene.BigInt()
+    has_more = graphene.Boolean()
 
 # ===== GraphQL Query (pagination & filtering) =====
 
@@ -308,50 +620,138 @@ class Query(graphene.ObjectType):
         season=graphene.Int(),
         episode_num=graphene.Int(),
         title=graphene.String(),
+        aired_after=graphene.Date(),
+        aired_before=graphene.Date(),
         limit=graphene.Int(),
         offset=graphene.Int()
     )
     episode = graphene.Field(EpisodeType, id=graphene.Int(required=True))
+    episodes_by_ids = graphene.List(EpisodeType, ids=graphene.List(graphene.Int, required=True))
     all_colors = graphene.List(ColorType)
     color = graphene.Field(ColorType, id=graphene.Int(required=True))
     all_subjects = graphene.List(SubjectType)
     subject = graphene.Field(SubjectType, id=graphene.Int(required=True))
+    cooccurrence = graphene.Field(CooccurrenceType, kind=graphene.String(required=True))
+    period_frequency = graphene.List(PeriodFrequencyType, period=graphene.String(required=True))
+    distributions = graphene.List(DistributionType)
+    changes = graphene.Field(ChangeFeedType, since=graphene.BigInt(), limit=graphene.Int())
+    timeline = graphene.List(
+        TimelineBucketType,
+        bucket=graphene.String(),
+        aired_after=graphene.Date(),
+        aired_before=graphene.Date(),
+        top=graphene.Int()
+    )
+    similar_episodes = graphene.List(
+        SimilarEpisodeType,
+        id=graphene.Int(required=True),
+        k=graphene.Int(),
+        metric=graphene.String()
+    )
+    nearest_colors = graphene.List(ColorMatchType, hex=graphene.String(required=True), k=graphene.Int())
+    palette_episodes = graphene.List(
+        PaletteMatchType,
+        hexes=graphene.List(graphene.String, required=True),
+        k=graphene.Int()
+    )
 
     def resolve_all_episodes(self, info, color_id=None, subject_id=None,
                              season=None, episode_num=None, title=None,
+                             aired_after=None, aired_before=None,
                              limit=None, offset=None):
-        query = Episode.query
-        if color_id:
-            query = query.join(Episode.colors).filter(Color.id == color_id)
-        if subject_id:
-            query = query.join(Episode.subjects).filter(Subject.id == subject_id)
-        if season:
-            query = query.filter(Episode.season == season)
-        if episode_num:
-            query = query.filter(Episode.episode == episode_num)
-        if title:
-            query = query.filter(Episode.title.ilike(f"%{title}%"))
+        if read_model is not None:
+            rows = read_model.filter_episodes(
+                color_id, subject_id, season, episode_num, title, aired_after, aired_before
+            )
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+            return [read_model.episode_dict(i, with_links=True) for i in rows]
+        statement = dto.episode_select(
+            color_id, subject_id, season, episode_num, title, aired_after, aired_before
+        )
         if limit is not None:
-            query = query.limit(limit)
+            statement = statement.limit(limit)
         if offset is not None:
-            query = query.offset(offset)
-        return query.all()
+            statement = statement.offset(offset)
+        return dto.episode_rows(statement)
 
     def resolve_episode(self, info, id):
+        if read_model is not None:
+            pos = read_model.episode_position(id)
+            return read_model.episode_dict(pos, with_links=True) if pos is not None else None
         return Episode.query.get(id)
 
+    def resolve_episodes_by_ids(self, info, ids):
+        # One entry per requested id (null if unknown), fetched with one IN query
+        if len(ids) > MAX_IDS:
+            raise Exception(f"ids must list at most {MAX_IDS} ids")
+        if read_model is not None:
+            positions = [read_model.episode_position(i) for i in ids]
+            return [read_model.episode_dict(pos, with_links=True) if pos is not None else None for pos in positions]
+        episodes = {ep.id: ep for ep in Episode.query.filter(Episode.id.in_(ids))}
+        return [episodes.get(i) for i in ids]
+
     def resolve_all_colors(self, info):
-        return Color.query.all()
+        if read_model is not None:
+            return read_model.all_colors()
+        return dto.color_rows()
 
     def resolve_color(self, info, id):
+        if read_model is not None:
+            pos = read_model.color_position(id)
+            return read_model.color_dict(pos) if pos is not None else None
         return Color.query.get(id)
 
     def resolve_all_subjects(self, info):
-        return Subject.query.all()
+        if read_model is not None:
+            return read_model.all_subjects()
+        return dto.subject_rows()
 
     def resolve_subject(self, info, id):
+        if read_model is not None:
+            pos = read_model.subject_position(id)
+            return read_model.subject_dict(pos) if pos is not None else None
         return Subject.query.get(id)
 
+    def resolve_cooccurrence(self, info, kind):
+        return analytics.cooccurrence(kind)
+
+    def resolve_period_frequency(self, info, period):
+        return analytics.period_frequency(period)
+
+    def resolve_distributions(self, info):
+        return analytics.distributions()
+
+    def resolve_changes(self, info, since=0, limit=500):
+        return changes.changes_since(since, max(1, min(limit, MAX_CHANGES)), read_model)
+
+    def resolve_timeline(self, info, bucket='year', aired_after=None, aired_before=None, top=5):
+        result = analytics.timeline(bucket, aired_after, aired_before, clamp_k(top, 5), read_model)
+        if result is None:
+            raise Exception(f"bucket must be one of {', '.join(analytics.TIMELINE_BUCKETS)}")
+        return result
+
+    def resolve_similar_episodes(self, info, id, k=10, metric='jaccard'):
+        if metric not in similarity.METRICS:
+            raise Exception(f"metric must be one of {', '.join(similarity.METRICS)}")
+        ranked = find_similar(id, k, metric) or []
+        return [SimilarEpisodeType(episode=ep, similarity=score) for ep, score in ranked]
+
+    def resolve_nearest_colors(self, info, hex, k=5):
+        hex_value = palette.parse_hex(hex)
+        if hex_value is None:
+            raise Exception("hex must be a RRGGBB color")
+        return [ColorMatchType(color=c, distance=d) for c, d in nearest_colors(hex_value, k)]
+
+    def resolve_palette_episodes(self, info, hexes, k=10):
+        if len(hexes) > palette.MAX_PALETTE_COLORS:
+            raise Exception(f"hexes must list at most {palette.MAX_PALETTE_COLORS} colors")
+        parsed = [palette.parse_hex(h) for h in hexes]
+        if not parsed or None in parsed:
+            raise Exception("hexes must be RRGGBB colors")
+        ranked = with_episodes(palette.match_palette(parsed, clamp_k(k), read_model))
+        return [PaletteMatchType(episode=ep, distance=d) for ep, d in ranked]
+
 # ===== GraphQL Mutations (create/update/delete) =====
 
 class CreateEpisode(graphene.Mutation):
@@ -553,6 +953,38 @@ app.add_url_rule(
     )
 )
 
+# Many sub-requests in one call. Single-entity GETs are coalesced per type using
+# the multi-get loaders (keys are Flask-RESTful's default endpoint names).
+BATCH_LOADERS = {
+    'episoderesource': ('episode_id', load_episodes),
+    'colorresource': ('color_id', load_colors),
+    'subjectresource': ('subject_id', load_subjects),
+}
+
+@app.route('/api/batch', methods=['POST'])
+@token_required
+def batch():
+    return batch_response(app, BATCH_LOADERS)
+
+# Change feed as Server-Sent Events; resumes after Last-Event-ID on reconnect
+@app.route('/api/changes/stream', methods=['GET'])
+@token_required
+def changes_stream():
+    since = request.headers.get('Last-Event-ID', type=int)
+    if since is None:
+        since = request.args.get('since', 0, type=int)
+    # Every stream holds a worker thread; past the limit, clients poll
+    # /api/changes or retry later instead of starving regular requests
+    if not changes.stream_slots.acquire(blocking=False):
+        return {'message': 'Too many open change streams, retry later'}, 503, {'Retry-After': '30'}
+    response = Response(
+        stream_with_context(changes.stream_changes(since, read_model)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(changes.stream_slots.release)
+    return response
+
 # Health check (SQLAlchemy 2.x requires text() for raw SQL)
 @app.route('/health', methods=['GET'])
 def health():
@@ -565,8 +997,57 @@ def health():
             "database_connection": f"failed: {e}"
         }), 500
 
+# Connection pool metrics for the primary and each read replica
+@app.route('/health/pools', methods=['GET'])
+@token_required
+def health_pools():
+    probe_replicas(db)
+    return jsonify(pool_metrics(db)), 200
+
+# ===== Warm-up =====
+# Run once per process by wsgi.create_app, in the gunicorn master when
+# preloading, so the first real requests skip mapper configuration, SQL
+# compilation, GraphQL validation and the catalog index builds.
+WARM_UP_PATHS = (
+    '/api/episodes', '/api/episodes?ids=1', '/api/colors', '/api/subjects',
+    '/api/episodes/timeline', '/api/analytics/distributions', '/api/changes',
+)
+WARM_UP_QUERY = '{ allEpisodes(limit: 10) { id title colors { id name } subjects { id name } } }'
+
+def warm_up():
+    """
+    Call the main read paths once, build the in-memory indexes, then close the
+    pooled connections so that no connection is shared with forked workers.
+    Failures are logged, not raised: with the database unreachable the server
+    still starts cold and /health reports the problem.
+    """
+    token = jwt.encode(
+        {'user': 'warm-up', 'role': 'viewer', 'exp': datetime.utcnow() + timedelta(minutes=1)},
+        app.config['SECRET_KEY'],
+        algorithm="HS256"
+    )
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+    for path in WARM_UP_PATHS:
+        response = client.get(path, headers=headers)
+        if response.status_code != 200:
+            app.logger.warning("Warm-up GET %s returned %s", path, response.status_code)
+    client.post('/graphql', headers=headers, json={'query': WARM_UP_QUERY})
+    try:
+        with app.app_context():
+            try:
+                similarity.index_cache.get(read_model)
+                palette.index_cache.get(read_model)
+            except Exception:
+                app.logger.exception("Warm-up could not build the catalog indexes")
+            finally:
+                db.session.remove()
+    finally:
+        reset_pools(app, db)
+
 # Run the application
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()  # Create tables if they don't exist
+    if not snapshot:
+        with app.app_context():
+            db.create_all()  # Create tables if they don't exist
     app.run(host='0.0.0.0', port=5000, debug=True)
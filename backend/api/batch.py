@@ -0,0 +1,117 @@
+# backend/api/batch.py
+"""
+Request batching for /api/batch.
+
+    POST /api/batch
+    {"requests": [
+        {"method": "GET", "path": "/api/episodes/12"},
+        {"path": "/api/colors/3"},
+        {"method": "POST", "path": "/graphql", "body": {"query": "{ allSubjects { id } }"}}
+    ]}
+    -> {"responses": [{"status": 200, "body": {...}}, ...]}   (same order)
+
+Streaming endpoints (/api/changes/stream) are refused with a 400 per
+sub-request. The batch is authenticated once (see app.token_required) and every
+sub-request runs in-process inside the batch's app context, so they share
+one DB session and, with replicas, one replica. In batches without writes,
+GET sub-requests for single entities are coalesced: all ids of the same type
+are loaded with one IN query. Batches with writes run strictly in order.
+"""
+from flask import jsonify, request
+from werkzeug.exceptions import HTTPException, NotFound
+
+from models import db
+from routing import USE_PRIMARY, wants_primary
+
+MAX_BATCH_REQUESTS = 50
+# WSGI environ key marking a sub-request created by an authenticated batch
+BATCH_AUTHENTICATED = 'batch.authenticated'
+
+
+def parse_batch(payload):
+    """[(method, path, body)] from a batch payload; raises ValueError with a client message."""
+    subrequests = payload.get('requests') if isinstance(payload, dict) else None
+    if not isinstance(subrequests, list) or not subrequests:
+        raise ValueError("Provide a non-empty 'requests' list")
+    if len(subrequests) > MAX_BATCH_REQUESTS:
+        raise ValueError(f"A batch may contain at most {MAX_BATCH_REQUESTS} requests")
+    parsed = []
+    for sub in subrequests:
+        path = sub.get('path') if isinstance(sub, dict) else None
+        if not isinstance(path, str) or not path.startswith('/'):
+            raise ValueError("Every request needs an absolute 'path'")
+        if path.split('?', 1)[0] == request.path:
+            raise ValueError("Batches cannot be nested")
+        parsed.append((str(sub.get('method', 'GET')).upper(), path, sub.get('body')))
+    return parsed
+
+
+def _dispatch(app, method, path, body, headers, primary):
+    """Run one sub-request through its view function and return (status, body)."""
+    # Sub-requests inherit the batch's authentication and database choice
+    environ = {BATCH_AUTHENTICATED: True, USE_PRIMARY: primary}
+    with app.test_request_context(path, method=method, json=body, headers=headers, environ_overrides=environ):
+        try:
+            # Skips before/after request hooks: the batch already authenticated
+            # and chose the database for every sub-request
+            response = app.make_response(app.dispatch_request())
+        except HTTPException as e:
+            return e.code, {'message': e.description}
+        except Exception:
+            app.logger.exception("Batch sub-request %s %s failed", method, path)
+            db.session.rollback()
+            return 500, {'message': 'Internal server error'}
+        try:
+            # A stream has no single body to return and would keep what it
+            # holds (e.g. a change stream slot) until closed
+            if response.is_streamed:
+                return 400, {'message': 'Streaming endpoints cannot be batched'}
+            return response.status_code, response.get_json(silent=True)
+        finally:
+            # Runs the response's close callbacks, as the WSGI server would
+            response.close()
+
+
+def run_batch(app, subrequests, loaders):
+    """
+    Execute [(method, path, body)] and return [{'status', 'body'}] in order.
+    `loaders` maps an endpoint name to (view arg, load(ids) -> {id: body}) and
+    is used to answer all GETs of that endpoint with a single lookup.
+    """
+    adapter = app.create_url_adapter(request)
+    headers = {'Authorization': request.headers.get('Authorization', '')}
+    responses = [None] * len(subrequests)
+    pending = {}  # endpoint -> [(index, id)]
+    # Routing sends batches containing writes to the primary; answering their
+    # reads early could reorder them around the writes
+    primary = wants_primary()
+    coalesce = not primary
+
+    for index, (method, path, body) in enumerate(subrequests):
+        if coalesce and method == 'GET' and '?' not in path:
+            try:
+                endpoint, args = adapter.match(path, method)
+            except HTTPException:
+                endpoint, args = None, {}
+            if endpoint in loaders:
+                pending.setdefault(endpoint, []).append((index, args[loaders[endpoint][0]]))
+                continue
+        status, response_body = _dispatch(app, method, path, body, headers, primary)
+        responses[index] = {'status': status, 'body': response_body}
+
+    for endpoint, lookups in pending.items():
+        found = loaders[endpoint][1](sorted({entity_id for _, entity_id in lookups}))
+        for index, entity_id in lookups:
+            if entity_id in found:
+                responses[index] = {'status': 200, 'body': found[entity_id]}
+            else:
+                responses[index] = {'status': 404, 'body': {'message': NotFound.description}}
+    return responses
+
+
+def batch_response(app, loaders):
+    try:
+        subrequests = parse_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify({'responses': run_batch(app, subrequests, loaders)}), 200
@@ -0,0 +1,151 @@
+# backend/api/bench_list_paths.py
+"""
+List-path benchmark: ORM instances vs the read-only DTOs of dto.py.
+
+For each list endpoint, runs the previous ORM implementation and the DTO one
+against the configured database (DATABASE_URL / DB_* as for the app) and
+reports, per path:
+
+  latency  median over --runs runs, ms (a fresh session per run, so the ORM
+           side never answers from its identity map)
+  held     memory held by the loaded rows before serialization, KiB
+  peak     peak memory while loading and serializing, KiB
+
+GraphQL cases execute the same query through the API schema (DTOs) and through
+a schema whose resolvers return ORM instances; both use the API's types.
+
+    cd backend/api && python bench_list_paths.py [--runs N]
+"""
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+
+import graphene
+
+import app as api_app
+import dto
+from app import EpisodeType, ColorType, SubjectType, to_dict
+from models import db, Episode, Color, Subject
+
+EPISODES_QUERY = '{ allEpisodes { id title season episode airDate numColors colors { id name hex } subjects { id name } } }'
+COLORS_QUERY = '{ allColors { id name hex } }'
+
+
+class OrmQuery(graphene.ObjectType):
+    """The GraphQL list fields as they resolved before dto.py."""
+    all_episodes = graphene.List(EpisodeType)
+    all_colors = graphene.List(ColorType)
+    all_subjects = graphene.List(SubjectType)
+
+    def resolve_all_episodes(self, info):
+        return Episode.query.all()
+
+    def resolve_all_colors(self, info):
+        return Color.query.all()
+
+    def resolve_all_subjects(self, info):
+        return Subject.query.all()
+
+
+orm_schema = graphene.Schema(query=OrmQuery)
+
+
+def orm_episode_dicts(episodes):
+    result = []
+    for ep in episodes:
+        ep_dict = to_dict(ep)
+        ep_dict['colors'] = [to_dict(c) for c in ep.colors]
+        ep_dict['subjects'] = [to_dict(s) for s in ep.subjects]
+        result.append(ep_dict)
+    return result
+
+
+def graphql(schema, query):
+    def execute():
+        result = schema.execute(query)
+        if result.errors:
+            raise RuntimeError(result.errors)
+        return result.data
+    return execute
+
+
+# name -> {side: (load, serialize)}
+CASES = {
+    'REST /api/episodes': {
+        'orm': (lambda: Episode.query.all(), orm_episode_dicts),
+        'dto': (lambda: dto.episode_rows(dto.episode_select()), lambda rows: [dto.episode_dict(r) for r in rows]),
+    },
+    'REST /api/episodes?season=3': {
+        'orm': (lambda: Episode.query.filter(Episode.season == 3).all(), orm_episode_dicts),
+        'dto': (lambda: dto.episode_rows(dto.episode_select(season=3)), lambda rows: [dto.episode_dict(r) for r in rows]),
+    },
+    'REST /api/colors': {
+        'orm': (lambda: Color.query.all(), lambda colors: [to_dict(c) for c in colors]),
+        'dto': (dto.color_rows, lambda rows: [r._asdict() for r in rows]),
+    },
+    'REST /api/subjects': {
+        'orm': (lambda: Subject.query.all(), lambda subjects: [to_dict(s) for s in subjects]),
+        'dto': (dto.subject_rows, lambda rows: [r._asdict() for r in rows]),
+    },
+    'GraphQL allEpisodes': {
+        'orm': (graphql(orm_schema, EPISODES_QUERY), lambda data: data),
+        'dto': (graphql(api_app.schema, EPISODES_QUERY), lambda data: data),
+    },
+    'GraphQL allColors': {
+        'orm': (graphql(orm_schema, COLORS_QUERY), lambda data: data),
+        'dto': (graphql(api_app.schema, COLORS_QUERY), lambda data: data),
+    },
+}
+
+
+def latency(load, serialize, runs):
+    timings = []
+    for _ in range(runs):
+        db.session.remove()
+        start = time.perf_counter()
+        serialize(load())
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def memory(load, serialize):
+    """(held, peak) in KiB."""
+    db.session.remove()
+    # Connect and compile outside the measurement
+    serialize(load())
+    db.session.remove()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        rows = load()
+        held = tracemalloc.get_traced_memory()[0] - base
+        serialize(rows)
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+        db.session.remove()
+    return held / 1024, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+    if api_app.read_model is not None:
+        print("COLUMNAR_SNAPSHOT is set; the list paths do not query the database.")
+        return 1
+
+    print(f"{'':30} {'latency ms':>19} {'held KiB':>19} {'peak KiB':>19}")
+    print(f"{'':30} {'orm':>9} {'dto':>9} {'orm':>9} {'dto':>9} {'orm':>9} {'dto':>9}")
+    for name, sides in CASES.items():
+        results = {side: (latency(*fns, args.runs), *memory(*fns)) for side, fns in sides.items()}
+        (orm_ms, orm_held, orm_peak), (dto_ms, dto_held, dto_peak) = results['orm'], results['dto']
+        print(f"{name:30} {orm_ms:9.1f} {dto_ms:9.1f} {orm_held:9.0f} {dto_held:9.0f} {orm_peak:9.0f} {dto_peak:9.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    with api_app.app.app_context():
+        sys.exit(main())
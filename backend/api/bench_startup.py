@@ -0,0 +1,142 @@
+# backend/api/bench_startup.py
+"""
+Startup benchmark: import time and first-request latency of a worker.
+
+Each run starts a fresh interpreter (configured like the app: DATABASE_URL /
+DB_*, READ_ONLY_SNAPSHOT, COLUMNAR_SNAPSHOT) in one of two modes:
+
+  cold     imports the API the way every worker did without preloading,
+           then times the first call of each request below
+  preload  calls wsgi.create_app(preload=True) like the gunicorn master,
+           forks a worker (resetting its pools like post_fork) and times
+           the same first calls in the worker
+
+The second call of each request is timed as well, as the warm baseline.
+Times are medians over --runs runs, in milliseconds.
+
+    cd backend/api && python bench_startup.py [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import jwt
+
+REQUESTS = [
+    ('GET', '/api/episodes', None),
+    ('GET', '/api/episodes/1', None),
+    ('GET', '/api/colors/1', None),
+    ('GET', '/api/episodes/timeline', None),
+    ('GET', '/api/episodes/1/similar?k=5', None),
+    ('GET', '/api/episodes/palette?hex=1A3D5C&k=5', None),
+    ('POST', '/graphql', {'query': '{ allEpisodes(season: 3) { id title colors { id } subjects { id } } }'}),
+]
+
+
+def time_requests(app):
+    """{request: [first call ms, second call ms]}"""
+    client = app.test_client()
+    token = jwt.encode(
+        {'user': 'bench_startup', 'role': 'viewer', 'exp': datetime.utcnow() + timedelta(minutes=5)},
+        app.config['SECRET_KEY'],
+        algorithm="HS256"
+    )
+    headers = {'Authorization': f'Bearer {token}'}
+    timings = {}
+    for method, path, body in REQUESTS:
+        calls = []
+        for _ in range(2):
+            start = time.perf_counter()
+            client.open(path, method=method, json=body, headers=headers)
+            calls.append((time.perf_counter() - start) * 1000)
+        timings[f'{method} {path}'] = calls
+    return timings
+
+
+def run_cold():
+    start = time.perf_counter()
+    import app as api_app
+    startup = (time.perf_counter() - start) * 1000
+    return {'startup': startup, 'worker_boot': startup, 'requests': time_requests(api_app.app)}
+
+
+def run_preload():
+    from wsgi import create_app
+    start = time.perf_counter()
+    app = create_app(preload=True)
+    startup = (time.perf_counter() - start) * 1000
+
+    read_end, write_end = os.pipe()
+    fork_start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        import app as api_app
+        from routing import reset_pools
+        reset_pools(app, api_app.db, close=False)
+        result = {'worker_boot': (time.perf_counter() - fork_start) * 1000, 'requests': time_requests(app)}
+        with os.fdopen(write_end, 'w') as out:
+            json.dump(result, out)
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as pipe:
+        result = json.load(pipe)
+    os.waitpid(pid, 0)
+    result['startup'] = startup
+    return result
+
+
+def measure(mode, runs):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-W', 'ignore', __file__, '--mode', mode],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    median = lambda values: statistics.median(values)
+    return {
+        'startup': median([r['startup'] for r in results]),
+        'worker_boot': median([r['worker_boot'] for r in results]),
+        'requests': {
+            name: [median([r['requests'][name][i] for r in results]) for i in range(2)]
+            for name in results[0]['requests']
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--mode', choices=('cold', 'preload'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        result = run_cold() if args.mode == 'cold' else run_preload()
+        print(json.dumps(result))
+        return 0
+
+    cold = measure('cold', args.runs)
+    preload = measure('preload', args.runs)
+    print(f"{'':58} {'cold':>9} {'preload':>9}")
+    print(f"{'import / create_app (once per worker vs once in master)':58} "
+          f"{cold['startup']:9.1f} {preload['startup']:9.1f}")
+    print(f"{'worker boot (import vs fork)':58} {cold['worker_boot']:9.1f} {preload['worker_boot']:9.1f}")
+    print("first request (second request):")
+    first_total = {'cold': 0.0, 'preload': 0.0}
+    for name, (first, second) in cold['requests'].items():
+        preloaded = preload['requests'][name][0]
+        first_total['cold'] += first
+        first_total['preload'] += preloaded
+        print(f"  {name[:56]:56} {first:9.1f} {preloaded:9.1f}   ({second:.1f})")
+    print(f"{'  total':58} {first_total['cold']:9.1f} {first_total['preload']:9.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
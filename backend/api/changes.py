@@ -0,0 +1,154 @@
+# backend/api/changes.py
+import json
+import threading
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+from flask_sqlalchemy.session import Session
+
+from config import CHANGE_POLL_INTERVAL, CHANGE_STREAM_TIMEOUT, MAX_CHANGE_STREAMS
+from models import db, Episode, Color, Subject, change_log, change_seq
+
+ENTITIES = {Episode: 'episode', Color: 'color', Subject: 'subject'}
+# op is create, update or delete for an entity; run_etl appends a single
+# ('catalog', 0, 'reload') entry after replacing the whole dataset
+RELOAD = ('catalog', 0, 'reload')
+HEARTBEAT = 15
+# Open streams of this worker; released when the response is closed
+stream_slots = threading.BoundedSemaphore(MAX_CHANGE_STREAMS)
+
+
+# ===== Write side =====
+# Every flush that touches episodes, colors or subjects appends one row per
+# entity, in the same transaction as the change itself.
+
+def allocate_seq(session, n):
+    """
+    Reserve `n` sequence numbers and return the last one. The counter row stays
+    locked until the transaction ends, so sequence order is also commit order
+    and a reader polling with since= can never skip a late commit.
+    The row is seeded with the schema (init.sql, models.py), so concurrent
+    writers never race to create it.
+    """
+    result = session.execute(change_seq.update().where(change_seq.c.id == 1).values(seq=change_seq.c.seq + n))
+    if result.rowcount == 0:
+        raise RuntimeError("change_seq has no counter row; run `python run_etl.py --schema-only`")
+    return session.execute(sa.select(change_seq.c.seq).where(change_seq.c.id == 1)).scalar_one()
+
+
+def collect_changes(session):
+    """[(object, op)] for the pending flush; new objects get their id only after it."""
+    changes = []
+    for obj in session.new:
+        if type(obj) in ENTITIES:
+            changes.append((obj, 'create'))
+    for obj in session.dirty:
+        if type(obj) in ENTITIES and session.is_modified(obj):
+            changes.append((obj, 'update'))
+    for obj in session.deleted:
+        if type(obj) in ENTITIES:
+            changes.append((obj, 'delete'))
+            if isinstance(obj, (Color, Subject)):
+                # Deleting a color/subject unlinks it from every episode that used it
+                changes.extend((ep, 'update') for ep in obj.episodes if ep not in session.deleted)
+    return changes
+
+
+def append_changes(session, changes):
+    rows = {}
+    for obj, op in changes:
+        key = (ENTITIES[type(obj)], obj.id)
+        # One row per entity and flush; a delete wins over an update
+        if rows.get(key) not in ('create', 'delete'):
+            rows[key] = op
+    if not rows:
+        return
+    last = allocate_seq(session, len(rows))
+    now = datetime.utcnow()
+    session.execute(change_log.insert(), [
+        {'seq': seq, 'entity': entity, 'entity_id': entity_id, 'op': op, 'changed_at': now}
+        for seq, ((entity, entity_id), op) in enumerate(sorted(rows.items()), start=last - len(rows) + 1)
+    ])
+
+
+def init_change_log():
+    """Append to the change log on every ORM write (REST and GraphQL mutations alike)."""
+
+    @sa.event.listens_for(Session, 'before_flush')
+    def on_before_flush(session, flush_context, instances):
+        session.info.setdefault('changes', []).extend(collect_changes(session))
+
+    @sa.event.listens_for(Session, 'after_flush')
+    def on_after_flush(session, flush_context):
+        changes = session.info.pop('changes', None)
+        if changes:
+            append_changes(session, changes)
+
+
+# ===== Read side =====
+
+def current_seq(read_model=None):
+    """Seq of the latest change, i.e. a version number for the whole dataset."""
+    if read_model is not None:
+        return read_model.meta.get('change_seq', 0)
+    return db.session.execute(sa.select(change_seq.c.seq).where(change_seq.c.id == 1)).scalar() or 0
+
+
+def _entry(seq, entity, entity_id, op, changed_at):
+    if isinstance(changed_at, datetime):
+        changed_at = changed_at.isoformat(timespec='seconds')
+    return {'seq': seq, 'entity': entity, 'id': entity_id, 'op': op, 'changed_at': changed_at}
+
+
+def changes_since(since=0, limit=500, read_model=None):
+    """
+    Entries with seq > since, oldest first, plus the seq to resume from and
+    whether more entries are waiting. A columnar snapshot's only entry is the
+    reload it was built by.
+    """
+    if read_model is not None:
+        seq = read_model.meta.get('change_seq', 0)
+        entries = [_entry(seq, *RELOAD, read_model.meta.get('generated_at'))] if seq > since else []
+        return {'changes': entries, 'last_seq': max(since, seq), 'has_more': False}
+
+    rows = db.session.execute(
+        sa.select(change_log.c.seq, change_log.c.entity, change_log.c.entity_id, change_log.c.op, change_log.c.changed_at)
+        .where(change_log.c.seq > since)
+        .order_by(change_log.c.seq)
+        .limit(limit + 1)
+    ).all()
+    entries = [_entry(*row) for row in rows[:limit]]
+    return {
+        'changes': entries,
+        'last_seq': entries[-1]['seq'] if entries else since,
+        'has_more': len(rows) > limit,
+    }
+
+
+def stream_changes(since=0, read_model=None, poll_interval=CHANGE_POLL_INTERVAL, timeout=CHANGE_STREAM_TIMEOUT):
+    """
+    Server-Sent Events for every change after `since`. Each event's id is its
+    seq, so a reconnecting EventSource resumes via Last-Event-ID. The stream
+    ends after `timeout` seconds to free the worker; clients just reconnect.
+    """
+    yield f"retry: {poll_interval * 1000}\n\n"
+    deadline = time.monotonic() + timeout
+    quiet_since = time.monotonic()
+    while time.monotonic() < deadline:
+        feed = changes_since(since, read_model=read_model)
+        if read_model is None:
+            # End the transaction between polls: it returns the connection to the
+            # pool and lets the next poll see rows committed in the meantime
+            db.session.rollback()
+        for entry in feed['changes']:
+            yield f"id: {entry['seq']}\nevent: change\ndata: {json.dumps(entry)}\n\n"
+        since = feed['last_seq']
+        if feed['changes']:
+            quiet_since = time.monotonic()
+        elif time.monotonic() - quiet_since >= HEARTBEAT:
+            # Comment line; keeps proxies from closing an idle connection
+            yield ": keep-alive\n\n"
+            quiet_since = time.monotonic()
+        if not feed['has_more']:
+            time.sleep(poll_interval)
@@ -0,0 +1,198 @@
+# backend/api/columnar.py
+"""
+Read side of the columnar snapshot written by etl/run_etl.py (--columnar-snapshot).
+
+File layout:
+    8 bytes   magic b'JOYCOL01'
+    8 bytes   little-endian uint64 length of the JSON header
+    header    {"arrays": {name: {"dtype", "count", "offset"}}, "meta": {...}}
+    arrays    raw little-endian arrays, each starting on a 64-byte boundary
+
+Strings are stored as one utf-8 blob per column plus an int32 offsets array
+(n + 1 entries); an empty string means NULL. Episode -> color and
+episode -> subject links are CSR-encoded: `<name>_indptr` (n_episodes + 1)
+and `<name>_indices` holding row positions into the colors/subjects columns.
+
+The file is memory-mapped read-only and the arrays are zero-copy views into
+it, so every worker shares the same physical pages through the OS page cache.
+"""
+import json
+import mmap
+import struct
+from datetime import date
+
+import numpy as np
+
+MAGIC = b'JOYCOL01'
+EPOCH = date(1970, 1, 1).toordinal()
+
+
+class StringColumn:
+    """utf-8 string table backed by the mapped file."""
+
+    def __init__(self, data, offsets):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        start, end = self._offsets[i], self._offsets[i + 1]
+        if start == end:
+            return None
+        return self._data[start:end].tobytes().decode('utf-8')
+
+
+class ColumnarSnapshot:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:8] != MAGIC:
+            raise ValueError(f"{path} is not a columnar snapshot")
+        (header_len,) = struct.unpack_from('<Q', self._mmap, 8)
+        header = json.loads(self._mmap[16:16 + header_len])
+        self.meta = header.get('meta', {})
+
+        arrays = {
+            name: np.frombuffer(self._mmap, dtype=spec['dtype'], count=spec['count'], offset=spec['offset'])
+            for name, spec in header['arrays'].items()
+        }
+        self._arrays = arrays
+
+        # Episodes (rows sorted by id)
+        self.episode_id = arrays['episode_id']
+        self.season = arrays['season']
+        self.episode = arrays['episode']
+        self.air_date = arrays['air_date']  # days since 1970-01-01, -1 for NULL
+        self.num_colors = arrays['num_colors']
+        self.title = self._strings('title')
+        self.youtube_src = self._strings('youtube_src')
+        self.img_src = self._strings('img_src')
+        self.extra_info = self._strings('extra_info')
+
+        # Colors and subjects (rows sorted by id)
+        self.color_id = arrays['color_id']
+        self.color_name = self._strings('color_name')
+        self.color_hex = self._strings('color_hex')
+        self.subject_id = arrays['subject_id']
+        self.subject_name = self._strings('subject_name')
+
+        # Adjacency
+        self.episode_colors_indptr = arrays['episode_colors_indptr']
+        self.episode_colors_indices = arrays['episode_colors_indices']
+        self.episode_subjects_indptr = arrays['episode_subjects_indptr']
+        self.episode_subjects_indices = arrays['episode_subjects_indices']
+
+    def _strings(self, name):
+        return StringColumn(self._arrays[f'{name}_data'], self._arrays[f'{name}_offsets'])
+
+    def warm(self):
+        """Ask the kernel to read the whole file in ahead of the first request."""
+        if hasattr(mmap, 'MADV_WILLNEED'):
+            self._mmap.madvise(mmap.MADV_WILLNEED)
+
+    # ----- Row lookups -----
+
+    @staticmethod
+    def _position(ids, value):
+        pos = int(np.searchsorted(ids, value))
+        if pos < len(ids) and ids[pos] == value:
+            return pos
+        return None
+
+    def episode_position(self, episode_id):
+        return self._position(self.episode_id, episode_id)
+
+    def color_position(self, color_id):
+        return self._position(self.color_id, color_id)
+
+    def subject_position(self, subject_id):
+        return self._position(self.subject_id, subject_id)
+
+    def _linked_episodes(self, indptr, indices, target):
+        """Episode row positions whose adjacency list contains `target`."""
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        return np.unique(rows[indices == target])
+
+    def air_date_of(self, i):
+        days = int(self.air_date[i])
+        return date.fromordinal(EPOCH + days) if days >= 0 else None
+
+    def filter_episodes(self, color_id=None, subject_id=None, season=None,
+                        episode_num=None, title=None, aired_after=None, aired_before=None):
+        """Row positions matching the same filters as the SQL list queries."""
+        mask = np.ones(len(self.episode_id), dtype=bool)
+        if color_id:
+            pos = self.color_position(color_id)
+            linked = np.zeros_like(mask)
+            if pos is not None:
+                linked[self._linked_episodes(self.episode_colors_indptr, self.episode_colors_indices, pos)] = True
+            mask &= linked
+        if subject_id:
+            pos = self.subject_position(subject_id)
+            linked = np.zeros_like(mask)
+            if pos is not None:
+                linked[self._linked_episodes(self.episode_subjects_indptr, self.episode_subjects_indices, pos)] = True
+            mask &= linked
+        if season:
+            mask &= self.season == season
+        if episode_num:
+            mask &= self.episode == episode_num
+        # Both bounds are inclusive; NULL air dates (-1) never match a bound
+        if aired_after:
+            mask &= self.air_date >= aired_after.toordinal() - EPOCH
+        if aired_before:
+            mask &= (self.air_date >= 0) & (self.air_date <= aired_before.toordinal() - EPOCH)
+        rows = np.flatnonzero(mask)
+        if title:
+            needle = title.lower()
+            rows = [i for i in rows if needle in self.title[i].lower()]
+        return [int(i) for i in rows]
+
+    def episodes_for_color(self, pos):
+        return [int(i) for i in self._linked_episodes(self.episode_colors_indptr, self.episode_colors_indices, pos)]
+
+    def episodes_for_subject(self, pos):
+        return [int(i) for i in self._linked_episodes(self.episode_subjects_indptr, self.episode_subjects_indices, pos)]
+
+    # ----- Serialization (same shape as app.to_dict) -----
+
+    def episode_dict(self, i, with_links=False):
+        air_date = self.air_date_of(i)
+        extra_info = self.extra_info[i]
+        result = {
+            'id': int(self.episode_id[i]),
+            'title': self.title[i],
+            'season': int(self.season[i]),
+            'episode': int(self.episode[i]),
+            'air_date': air_date.isoformat() if air_date else None,
+            'youtube_src': self.youtube_src[i],
+            'img_src': self.img_src[i],
+            'num_colors': int(self.num_colors[i]),
+            'extra_info': json.loads(extra_info) if extra_info else None,
+        }
+        if with_links:
+            ptr, idx = self.episode_colors_indptr, self.episode_colors_indices
+            result['colors'] = [self.color_dict(int(j)) for j in idx[ptr[i]:ptr[i + 1]]]
+            ptr, idx = self.episode_subjects_indptr, self.episode_subjects_indices
+            result['subjects'] = [self.subject_dict(int(j)) for j in idx[ptr[i]:ptr[i + 1]]]
+        return result
+
+    def color_dict(self, j):
+        return {'id': int(self.color_id[j]), 'name': self.color_name[j], 'hex': self.color_hex[j]}
+
+    def subject_dict(self, j):
+        return {'id': int(self.subject_id[j]), 'name': self.subject_name[j]}
+
+    def all_colors(self):
+        return [self.color_dict(j) for j in range(len(self.color_id))]
+
+    def all_subjects(self):
+        return [self.subject_dict(j) for j in range(len(self.subject_id))]
+
+
+def load_columnar_snapshot(path):
+    snapshot = ColumnarSnapshot(path)
+    snapshot.warm()
+    return snapshot
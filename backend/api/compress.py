@@ -0,0 +1,177 @@
+# backend/api/compress.py
+"""
+Response compression with a per-worker cache of precompressed bodies.
+
+Responses of at least COMPRESS_MIN_SIZE bytes are compressed with the best
+encoding the client accepts (Accept-Encoding, q-values honored): zstd and br
+when the optional zstandard / brotli packages are installed, gzip always.
+
+Authenticated reads (REST GETs and GraphQL queries) that are large enough to
+compress are also kept, keyed by the dataset version (the change feed's
+latest seq) and the request. A repeated request is answered from the stored
+bytes before its view runs, so it is neither re-serialized nor re-compressed.
+Every write moves the version forward, so a stored body is never stale.
+"""
+import gzip
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+from config import COMPRESS_CACHE_MB, COMPRESS_MIN_SIZE
+from routing import is_graphql_mutation
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Encoders in order of preference when the client accepts several equally
+# (smallest output first). The levels cost a few ms on the full episode list,
+# which the cache then pays once per dataset version.
+ENCODERS = {}
+if brotli is not None:
+    ENCODERS['br'] = lambda data: brotli.compress(data, quality=6)
+if zstandard is not None:
+    # Compressor objects must not be shared between threads
+    ENCODERS['zstd'] = lambda data: zstandard.ZstdCompressor(level=9).compress(data)
+ENCODERS['gzip'] = lambda data: gzip.compress(data, compresslevel=6)
+
+
+# Per-request state lives in the WSGI environ: flask.g belongs to the app
+# context, which a later request reuses when one is already pushed
+CACHE_KEY = 'compress.cache_key'
+CACHED = 'compress.cached'
+
+
+def negotiate(accept_encodings):
+    """The encoding to use for a parsed Accept-Encoding header, or None for identity."""
+    best, best_quality = None, 0
+    for name in ENCODERS:
+        quality = accept_encodings.quality(name)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def is_compressible(mimetype):
+    return mimetype == 'application/json' or mimetype.startswith('text/')
+
+
+class ResponseCache:
+    """
+    Response bodies by request key for the latest dataset version seen, each
+    stored uncompressed plus once per encoding requested so far. Least
+    recently used keys are evicted beyond `max_bytes`; a newer version drops
+    everything.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.version = None
+        self._entries = OrderedDict()  # key -> (content type, {encoding: body})
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, version, key, encoding):
+        """(content type, body) for a stored request, compressing it on first use of an encoding."""
+        with self._lock:
+            if version != self.version or key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            content_type, bodies = self._entries[key]
+            body = bodies.get(encoding)
+            raw = bodies[None]
+        if body is None:
+            body = ENCODERS[encoding](raw)
+            self.put(version, key, content_type, encoding, body)
+        return content_type, body
+
+    def put(self, version, key, content_type, encoding, body, raw=None):
+        with self._lock:
+            if self.version is None or version > self.version:
+                self._entries.clear()
+                self._size = 0
+                self.version = version
+            elif version < self.version:
+                # Read from a replica that is behind another request of this worker
+                return
+            if key not in self._entries:
+                if raw is None:
+                    return
+                self._entries[key] = (content_type, {None: raw})
+                self._size += len(raw)
+            bodies = self._entries[key][1]
+            if encoding is not None and encoding not in bodies:
+                bodies[encoding] = body
+                self._size += len(body)
+            while self._size > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= sum(len(b) for b in evicted.values())
+
+
+def init_compression(app, dataset_version, authorized, cache_paths=('/api/', '/graphql'), graphql_path='/graphql',
+                     min_size=COMPRESS_MIN_SIZE, cache_bytes=COMPRESS_CACHE_MB * 1024 * 1024):
+    """
+    Compress responses and serve repeated reads from the cache.
+    `dataset_version()` returns the current version of the data and
+    `authorized()` whether the request may read it; a cached body is only
+    served to requests that would have passed the view's own checks.
+    """
+    cache = ResponseCache(cache_bytes)
+
+    def cache_key():
+        if not cache_bytes or not request.path.startswith(cache_paths):
+            return None
+        if request.method == 'GET':
+            return request.full_path
+        if request.method == 'POST' and request.path == graphql_path and not is_graphql_mutation(request):
+            return f"{request.full_path} {request.get_data(as_text=True)}"
+        return None
+
+    @app.before_request
+    def serve_cached():
+        key = cache_key()
+        if key is None or not authorized():
+            return None
+        request.environ[CACHE_KEY] = (dataset_version(), key)
+        encoding = negotiate(request.accept_encodings)
+        cached = cache.get(*request.environ[CACHE_KEY], encoding)
+        if cached is None:
+            return None
+        content_type, body = cached
+        response = Response(body, content_type=content_type)
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        request.environ[CACHED] = True
+        return response
+
+    @app.after_request
+    def compress_response(response):
+        if request.environ.get(CACHED) or response.direct_passthrough or response.is_streamed:
+            return response
+        if 'Content-Encoding' in response.headers or not is_compressible(response.mimetype):
+            return response
+        response.vary.add('Accept-Encoding')
+        raw = response.get_data()
+        if len(raw) < min_size:
+            return response
+        encoding = negotiate(request.accept_encodings)
+        body = ENCODERS[encoding](raw) if encoding else raw
+        # GraphQL reports resolver errors with a 200; those are not kept
+        if response.status_code == 200 and CACHE_KEY in request.environ and not (
+            request.path == graphql_path and b'"errors"' in raw
+        ):
+            cache.put(*request.environ[CACHE_KEY], response.content_type, encoding, body, raw=raw)
+        if encoding is not None:
+            response.set_data(body)
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+    return cache
@@ -0,0 +1,121 @@
+# backend/api/config.py
+import os
+
+
+def env_bool(name, default=False):
+    """Read a boolean flag such as 'true', '1' or 'yes' from the environment."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    return int(value)
+
+
+# ===== Database URIs =====
+
+def primary_database_uri():
+    """
+    URI of the writable primary database.
+    DATABASE_URL takes precedence (e.g. sqlite:///primary.db for local runs),
+    otherwise the MySQL URI is assembled from the DB_* variables.
+    """
+    url = os.getenv('DATABASE_URL')
+    if url:
+        return url
+    db_user = os.getenv('DB_USER')
+    db_password = os.getenv('DB_PASSWORD')
+    db_host = os.getenv('DB_HOST')
+    db_port = os.getenv('DB_PORT')
+    db_name = os.getenv('DB_NAME')
+    return f"mysql+mysqlconnector://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+
+def read_only_snapshot():
+    """Path of the SQLite snapshot built by run_etl.py, if the API should serve from it."""
+    return os.getenv('READ_ONLY_SNAPSHOT')
+
+
+def snapshot_database_uri(path):
+    """
+    Open the snapshot read-only and immutable: SQLite then skips file locking
+    and change detection entirely, which is safe because the ETL replaces the
+    file atomically instead of modifying it.
+    """
+    return f"sqlite:///file:{os.path.abspath(path)}?mode=ro&immutable=1&uri=true"
+
+
+def columnar_snapshot():
+    """Path of the columnar snapshot built by run_etl.py, if workers should load it."""
+    return os.getenv('COLUMNAR_SNAPSHOT')
+
+
+def replica_database_uris():
+    """Comma-separated read replica URIs from DB_REPLICA_URLS (may be empty)."""
+    raw = os.getenv('DB_REPLICA_URLS', '')
+    return [u.strip() for u in raw.split(',') if u.strip()]
+
+
+# ===== Connection pool tuning =====
+
+def engine_options(prefix='DB_POOL'):
+    """
+    Pool settings for one engine, read from <prefix>_SIZE, <prefix>_MAX_OVERFLOW,
+    <prefix>_RECYCLE, <prefix>_TIMEOUT and <prefix>_PRE_PING.
+    Replica engines use the DB_REPLICA_POOL prefix and fall back to DB_POOL values.
+    """
+    def setting(suffix, default):
+        fallback = env_int(f'DB_POOL_{suffix}', default)
+        return env_int(f'{prefix}_{suffix}', fallback)
+
+    pre_ping = env_bool('DB_POOL_PRE_PING', True)
+    return {
+        'pool_size': setting('SIZE', 5),
+        'max_overflow': setting('MAX_OVERFLOW', 10),
+        # Recycle below MySQL's wait_timeout so idle connections are never stale
+        'pool_recycle': setting('RECYCLE', 1800),
+        'pool_timeout': setting('TIMEOUT', 30),
+        'pool_pre_ping': env_bool(f'{prefix}_PRE_PING', pre_ping),
+    }
+
+
+def replica_binds():
+    """SQLALCHEMY_BINDS entries for every configured read replica."""
+    options = engine_options('DB_REPLICA_POOL')
+    return {
+        f'replica_{i}': dict(options, url=url)
+        for i, url in enumerate(replica_database_uris())
+    }
+
+
+# Seconds a replica stays out of rotation after a connection failure
+REPLICA_RETRY_AFTER = env_int('DB_REPLICA_RETRY_AFTER', 30)
+
+# Bytes of the snapshot each connection maps into memory (0 disables mmap)
+SNAPSHOT_MMAP_SIZE = env_int('SNAPSHOT_MMAP_SIZE', 256 * 1024 * 1024)
+
+# Catalog size from which MinHash/LSH narrows similar-episode candidates
+SIMILAR_LSH_MIN_EPISODES = env_int('SIMILAR_LSH_MIN_EPISODES', 5000)
+
+# Seconds between change log polls of an open /api/changes/stream, and how long
+# a stream stays open before the client is asked to reconnect (with Last-Event-ID)
+CHANGE_POLL_INTERVAL = env_int('CHANGE_POLL_INTERVAL', 1)
+CHANGE_STREAM_TIMEOUT = env_int('CHANGE_STREAM_TIMEOUT', 300)
+# Streams a worker serves at once. Each holds one of its threads for up to
+# CHANGE_STREAM_TIMEOUT seconds, so this must stay below GUNICORN_THREADS
+MAX_CHANGE_STREAMS = env_int('MAX_CHANGE_STREAMS', 4)
+
+# Responses from this many bytes are compressed (gzip, or br/zstd when the
+# brotli/zstandard packages are installed), and large reads are cached
+# precompressed per worker up to COMPRESS_CACHE_MB (0 disables the cache)
+COMPRESS_MIN_SIZE = env_int('COMPRESS_MIN_SIZE', 1024)
+COMPRESS_CACHE_MB = env_int('COMPRESS_CACHE_MB', 64)
+
+# Import and warm up the API once in the gunicorn master, before the workers
+# are forked (see wsgi.py and gunicorn.conf.py)
+PRELOAD = env_bool('PRELOAD', True)
@@ -0,0 +1,106 @@
+# backend/api/dto.py
+"""
+Read-only DTOs for the list endpoints (REST /api/episodes, /api/colors,
+/api/subjects and GraphQL allEpisodes, allColors, allSubjects).
+
+Rows go straight from Core select()s into namedtuples, skipping everything an
+ORM instance carries (identity map entry, instance state, relationship
+collections) for data that is serialized once and dropped. An episode's
+colors and subjects are tuples assembled in one pass over a single query per
+junction table, and a color or subject is one shared tuple however many
+episodes use it. The GraphQL types resolve fields by attribute, so they take
+these tuples as they take ORM instances.
+"""
+from collections import namedtuple
+from itertools import groupby
+from operator import itemgetter
+
+import sqlalchemy as sa
+
+from models import db, Episode, Color, Subject, episode_colors, episode_subjects
+
+EPISODE_COLUMNS = tuple(c.name for c in Episode.__table__.columns)
+
+ColorRow = namedtuple('ColorRow', [c.name for c in Color.__table__.columns])
+SubjectRow = namedtuple('SubjectRow', [c.name for c in Subject.__table__.columns])
+EpisodeRow = namedtuple('EpisodeRow', EPISODE_COLUMNS + ('colors', 'subjects'))
+
+# Episode ids per IN (...) when loading links, as the ORM's selectin loader
+IN_CHUNK = 500
+
+
+def color_rows(ids=None):
+    statement = sa.select(*Color.__table__.columns)
+    if ids:
+        statement = statement.where(Color.id.in_(ids))
+    return [ColorRow(*row) for row in db.session.execute(statement)]
+
+
+def subject_rows(ids=None):
+    statement = sa.select(*Subject.__table__.columns)
+    if ids:
+        statement = statement.where(Subject.id.in_(ids))
+    return [SubjectRow(*row) for row in db.session.execute(statement)]
+
+
+def episode_select(color_id=None, subject_id=None, season=None, episode_num=None, title=None,
+                   aired_after=None, aired_before=None):
+    """select() of the episodes matching the list filters; callers may add ids, limit and offset."""
+    statement = sa.select(*Episode.__table__.columns)
+    if color_id:
+        statement = statement.join(episode_colors, episode_colors.c.episode_id == Episode.id).where(
+            episode_colors.c.color_id == color_id
+        )
+    if subject_id:
+        statement = statement.join(episode_subjects, episode_subjects.c.episode_id == Episode.id).where(
+            episode_subjects.c.subject_id == subject_id
+        )
+    if season:
+        statement = statement.where(Episode.season == season)
+    if episode_num:
+        statement = statement.where(Episode.episode == episode_num)
+    if title:
+        statement = statement.where(Episode.title.ilike(f"%{title}%"))
+    if aired_after:
+        statement = statement.where(Episode.air_date >= aired_after)
+    if aired_before:
+        statement = statement.where(Episode.air_date <= aired_before)
+    return statement
+
+
+def _links(table, column, model, make, episode_ids):
+    """{episode_id: (DTO, ...)} for one junction table."""
+    target = model.__table__
+    shared = {}
+    groups = {}
+    for start in range(0, len(episode_ids), IN_CHUNK):
+        rows = db.session.execute(
+            sa.select(table.c.episode_id, *target.columns)
+            .join(target, target.c.id == column)
+            .where(table.c.episode_id.in_(episode_ids[start:start + IN_CHUNK]))
+            .order_by(table.c.episode_id, column)
+        )
+        for episode_id, group in groupby(rows, key=itemgetter(0)):
+            groups[episode_id] = tuple(
+                shared.get(row[1]) or shared.setdefault(row[1], make(*row[1:])) for row in group
+            )
+    return groups
+
+
+def episode_rows(statement):
+    """EpisodeRow DTOs for an episode_select(), in its order, with their colors and subjects."""
+    episodes = db.session.execute(statement).all()
+    ids = [row.id for row in episodes]
+    colors = _links(episode_colors, episode_colors.c.color_id, Color, ColorRow, ids)
+    subjects = _links(episode_subjects, episode_subjects.c.subject_id, Subject, SubjectRow, ids)
+    return [EpisodeRow(*row, colors.get(row.id, ()), subjects.get(row.id, ())) for row in episodes]
+
+
+def episode_dict(row):
+    """Same shape as app.to_dict(episode) plus its colors and subjects."""
+    result = dict(zip(EPISODE_COLUMNS, row))
+    if result['air_date'] is not None:
+        result['air_date'] = result['air_date'].isoformat()
+    result['colors'] = [color._asdict() for color in row.colors]
+    result['subjects'] = [subject._asdict() for subject in row.subjects]
+    return result
@@ -0,0 +1,41 @@
+# backend/api/gunicorn.conf.py
+"""
+gunicorn settings for the API; run from backend/api:
+
+    gunicorn -c gunicorn.conf.py 'wsgi:create_app()'
+
+Set PRELOAD=false to import the API in every worker instead of the master.
+
+Workers are threaded: /api/changes/stream keeps a request open for up to
+CHANGE_STREAM_TIMEOUT seconds, which would pin a whole sync worker. Each
+stream holds one thread instead, and at most MAX_CHANGE_STREAMS of them per
+worker (see config.py), so the other threads keep serving regular traffic.
+Keep MAX_CHANGE_STREAMS below GUNICORN_THREADS, and DB_POOL_SIZE plus
+DB_POOL_MAX_OVERFLOW at or above it.
+"""
+import gc
+import os
+import sys
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+preload_app = os.getenv('PRELOAD', 'true').strip().lower() in ('1', 'true', 'yes', 'on')
+
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+# Above the stream window (CHANGE_STREAM_TIMEOUT, default 300 in config.py),
+# so an open stream is never mistaken for a hung worker
+timeout = int(os.getenv('GUNICORN_TIMEOUT', str(int(os.getenv('CHANGE_STREAM_TIMEOUT', '300')) + 30)))
+
+
+def pre_fork(server, worker):
+    # Also covers whatever the master allocated since create_app froze the heap
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    api = sys.modules.get('app')
+    if api is not None:
+        # Preloaded: the pools were created in the master; start this worker's own
+        from routing import reset_pools
+        reset_pools(api.app, api.db, close=False)
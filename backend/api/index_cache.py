@@ -0,0 +1,38 @@
+# backend/api/index_cache.py
+import threading
+
+from changes import current_seq
+
+
+class IndexCache:
+    """
+    Per-worker in-memory index over the catalog, built by `from_database` or,
+    when the columnar read model is loaded, by `from_read_model`.
+    It is kept for one dataset version (changes.current_seq(), which every
+    write by any worker moves forward) and rebuilt on first use after a newer
+    one, so the response cache never stores an answer from an older index
+    under a newer version.
+    """
+
+    def __init__(self, from_database, from_read_model):
+        self.from_database = from_database
+        self.from_read_model = from_read_model
+        self._built = (None, None)  # (version, index)
+        self._lock = threading.Lock()
+
+    def get(self, read_model=None):
+        version = current_seq(read_model)
+        built_version, index = self._built
+        # An older version comes from a replica lagging behind a read this
+        # worker already made; the newer index answers it as well
+        if index is not None and version <= built_version:
+            return index
+        with self._lock:
+            built_version, index = self._built
+            if index is None or version > built_version:
+                if read_model is not None:
+                    index = self.from_read_model(read_model)
+                else:
+                    index = self.from_database()
+                self._built = (version, index)
+            return index
@@ -1,23 +1,34 @@
 from flask_sqlalchemy import SQLAlchemy
 
-# Define a single, unbound SQLAlchemy instance
-db = SQLAlchemy()
+from routing import RoutingSession
+
+# Define a single, unbound SQLAlchemy instance (reads may go to replicas)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # Junction tables for many-to-many relationships
 episode_colors = db.Table(
     'episode_colors',
     db.Column('episode_id', db.Integer, db.ForeignKey('episodes.id'), primary_key=True),
     db.Column('color_id', db.Integer, db.ForeignKey('colors.id'), primary_key=True),
+    # Reverse of the primary key, for color -> episodes lookups
+    db.Index('idx_episode_colors_color', 'color_id', 'episode_id'),
 )
 
 episode_subjects = db.Table(
     'episode_subjects',
     db.Column('episode_id', db.Integer, db.ForeignKey('episodes.id'), primary_key=True),
     db.Column('subject_id', db.Integer, db.ForeignKey('subjects.id'), primary_key=True),
+    db.Index('idx_episode_subjects_subject', 'subject_id', 'episode_id'),
 )
 
 class Episode(db.Model):
     __tablename__ = 'episodes'
+    # Same indexes as db/init.sql, so create_all() databases plan queries alike
+    __table_args__ = (
+        db.UniqueConstraint('season', 'episode', name='unique_episode'),
+        db.Index('idx_episodes_episode', 'episode'),
+        db.Index('idx_episodes_air_date', 'air_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     season = db.Column(db.Integer, nullable=False)
@@ -31,13 +42,13 @@ class Episode(db.Model):
     colors = db.relationship(
         'Color',
         secondary=episode_colors,
-        lazy='subquery',
+        lazy='selectin',
         backref=db.backref('episodes', lazy=True),
     )
     subjects = db.relationship(
         'Subject',
         secondary=episode_subjects,
-        lazy='subquery',
+        lazy='selectin',
         backref=db.backref('episodes', lazy=True),
     )
 
@@ -51,3 +62,48 @@ class Subject(db.Model):
     __tablename__ = 'subjects'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), unique=True, nullable=False)
+
+# Materialized analytics, built by run_etl.py and kept current by analytics.py.
+# Symmetric co-occurrence kinds (color_color, subject_subject) store a_id <= b_id.
+analytics_cooccurrence = db.Table(
+    'analytics_cooccurrence',
+    db.Column('kind', db.String(32), primary_key=True),
+    db.Column('a_id', db.Integer, primary_key=True),
+    db.Column('b_id', db.Integer, primary_key=True),
+    db.Column('count', db.Integer, nullable=False),
+)
+
+analytics_period_frequency = db.Table(
+    'analytics_period_frequency',
+    db.Column('period', db.String(8), primary_key=True),
+    db.Column('period_value', db.Integer, primary_key=True),
+    db.Column('item_kind', db.String(16), primary_key=True),
+    db.Column('item_id', db.Integer, primary_key=True),
+    db.Column('count', db.Integer, nullable=False),
+)
+
+analytics_distribution = db.Table(
+    'analytics_distribution',
+    db.Column('kind', db.String(32), primary_key=True),
+    db.Column('value', db.Integer, primary_key=True),
+    db.Column('count', db.Integer, nullable=False),
+)
+
+# Change feed, appended to by changes.py on every write and by run_etl.py.
+# change_seq holds the single counter row (id 1) sequence numbers come from.
+change_log = db.Table(
+    'change_log',
+    db.Column('seq', db.BigInteger, primary_key=True, autoincrement=False),
+    db.Column('entity', db.String(16), nullable=False),
+    db.Column('entity_id', db.Integer, nullable=False),
+    db.Column('op', db.String(8), nullable=False),
+    db.Column('changed_at', db.DateTime, nullable=False),
+)
+
+change_seq = db.Table(
+    'change_seq',
+    db.Column('id', db.Integer, primary_key=True, autoincrement=False),
+    db.Column('seq', db.BigInteger, nullable=False),
+)
+# Seeded with the table (db.create_all), as init.sql does for MySQL
+db.event.listen(change_seq, 'after_create', db.DDL("INSERT INTO change_seq (id, seq) VALUES (1, 0)"))
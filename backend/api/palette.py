@@ -0,0 +1,129 @@
+# backend/api/palette.py
+import re
+
+import numpy as np
+import sqlalchemy as sa
+
+from index_cache import IndexCache
+from models import db, Episode, Color, episode_colors
+
+HEX_PATTERN = re.compile(r'^#?([0-9a-fA-F]{6})$')
+# Query colors per palette search; its distance table holds one row per
+# query color over every episode color link
+MAX_PALETTE_COLORS = 32
+
+# sRGB (D65) -> XYZ, and the D65 reference white
+SRGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def parse_hex(value):
+    """'#1A3D5C' or '1a3d5c' -> '#1A3D5C', or None if it is not a 6-digit hex color."""
+    match = HEX_PATTERN.match((value or '').strip())
+    return f"#{match.group(1).upper()}" if match else None
+
+
+def hex_to_lab(hexes):
+    """CIELAB coordinates (n x 3) for a list of '#RRGGBB' strings."""
+    rgb = np.array([[int(h[i:i + 2], 16) for i in (1, 3, 5)] for h in hexes], dtype=np.float64).reshape(-1, 3) / 255
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ SRGB_TO_XYZ.T / WHITE
+    delta = 6 / 29
+    f = np.where(xyz > delta ** 3, np.cbrt(xyz), xyz / (3 * delta ** 2) + 4 / 29)
+    return np.column_stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])])
+
+
+class PaletteIndex:
+    """
+    Colors as points in CIELAB, where Euclidean distance (CIE76 delta E)
+    approximates perceived difference, plus each episode's palette as CSR
+    rows of color positions. Queries are a single vectorized distance table.
+    """
+
+    def __init__(self, color_ids, color_hexes, episode_ids, indptr, indices):
+        valid = [i for i, h in enumerate(color_hexes) if parse_hex(h)]
+        self.color_ids = np.asarray(color_ids, dtype=np.int64)
+        self.lab = np.full((len(color_ids), 3), np.nan)
+        if valid:
+            self.lab[valid] = hex_to_lab([parse_hex(color_hexes[i]) for i in valid])
+        # Colors with an unparseable hex never match anything
+        self.searchable = np.flatnonzero(~np.isnan(self.lab[:, 0]))
+        self.episode_ids = np.asarray(episode_ids, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+
+    def _distances(self, hexes):
+        """Query colors x catalog colors delta E table."""
+        query = hex_to_lab(hexes)
+        return np.sqrt(((query[:, None, :] - self.lab[None, :, :]) ** 2).sum(axis=2))
+
+    def nearest_colors(self, hex_value, k=5):
+        """[(color_id, distance)] closest first."""
+        distances = self._distances([hex_value])[0][self.searchable]
+        order = np.lexsort((self.color_ids[self.searchable], distances))[:k]
+        return [(int(self.color_ids[self.searchable[i]]), float(distances[i])) for i in order]
+
+    def match_palette(self, hexes, k=10):
+        """
+        [(episode_id, distance)] closest first. An episode's distance is the mean,
+        over the query colors, of the delta E to its closest color in the episode.
+        """
+        table = np.nan_to_num(self._distances(hexes), nan=np.inf)
+        lengths = np.diff(self.indptr)
+        rows = np.flatnonzero(lengths > 0)
+        if not len(rows):
+            return []
+        # Closest episode color per query color: min over each CSR row segment
+        closest = np.minimum.reduceat(table[:, self.indices], self.indptr[rows], axis=1)
+        scores = closest.mean(axis=0)
+        finite = np.isfinite(scores)
+        rows, scores = rows[finite], scores[finite]
+        ids = self.episode_ids[rows]
+        order = np.lexsort((ids, scores))[:k]
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+
+def _from_read_model(read_model):
+    return PaletteIndex(
+        read_model.color_id,
+        [read_model.color_hex[j] for j in range(len(read_model.color_id))],
+        read_model.episode_id,
+        read_model.episode_colors_indptr,
+        read_model.episode_colors_indices,
+    )
+
+
+def _from_database():
+    session = db.session
+    colors = session.execute(sa.select(Color.id, Color.hex).order_by(Color.id)).all()
+    color_ids = np.array([c.id for c in colors], dtype=np.int64)
+    episode_ids = np.array(session.execute(sa.select(Episode.id).order_by(Episode.id)).scalars().all(), dtype=np.int64)
+
+    links = np.array(
+        session.execute(sa.select(episode_colors.c.episode_id, episode_colors.c.color_id)).all(), dtype=np.int64
+    ).reshape(-1, 2)
+    rows = np.searchsorted(episode_ids, links[:, 0])
+    cols = np.searchsorted(color_ids, links[:, 1])
+    valid = (rows < len(episode_ids)) & (cols < len(color_ids))
+    valid[valid] &= (episode_ids[rows[valid]] == links[valid, 0]) & (color_ids[cols[valid]] == links[valid, 1])
+    rows, cols = rows[valid], cols[valid]
+    order = np.lexsort((cols, rows))
+
+    indptr = np.zeros(len(episode_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(episode_ids)), out=indptr[1:])
+    return PaletteIndex(color_ids, [c.hex for c in colors], episode_ids, indptr, cols[order])
+
+
+index_cache = IndexCache(_from_database, _from_read_model)
+
+
+def nearest_colors(hex_value, k=5, read_model=None):
+    return index_cache.get(read_model).nearest_colors(hex_value, k)
+
+
+def match_palette(hexes, k=10, read_model=None):
+    return index_cache.get(read_model).match_palette(hexes, k)
@@ -0,0 +1,269 @@
+# backend/api/query_plans.py
+"""
+Query-plan regression suite for the API read paths.
+
+Sends a request for every REST resource and GraphQL query field (with each
+filter on its own and combined) through the app's test client, captures the
+SELECTs they emit and runs EXPLAIN on each one against the configured database
+(DATABASE_URL / DB_* as for the app). Every case logs in and runs in its own
+client and app context, like a request served by a worker, so no state (`g`,
+sessions, cached tokens) carries over from one case to the next. A case fails
+when a query
+
+  * fully scans a table holding more than --max-scan-rows rows, or
+  * sorts (filesort / temporary B-tree) while reading a table holding more
+    than --max-sort-rows rows.
+
+Row counts come from EXPLAIN on MySQL and from COUNT(*) on SQLite. Scans a
+path needs by design (e.g. building the in-memory similarity index) are
+listed per case with the reason. New endpoints should add their cases here.
+The suite exits non-zero on any failure; CI runs it on every push
+(.github/workflows/query-plans.yml).
+
+    cd backend/api && python query_plans.py [--max-scan-rows N] [--max-sort-rows N]
+"""
+import argparse
+import re
+import sys
+
+import sqlalchemy as sa
+
+import app as api_app
+from models import db
+
+MAX_SCAN_ROWS = 100
+MAX_SORT_ROWS = 1000
+
+# The credentials /login accepts
+LOGIN = {'username': 'admin', 'password': 'password'}
+
+# Scans that are part of a path's design, not a missing index
+SUBSTRING_SEARCH = "a '%title%' match cannot use a B-tree index"
+INDEX_BUILD = "builds the per-worker in-memory index (cached per dataset version)"
+WHOLE_CATALOG = "an unbounded timeline aggregates every link"
+
+
+def rest(name, path, allow=None):
+    return name, 'GET', path, None, allow or {}
+
+
+def graphql(name, query, allow=None):
+    return name, 'POST', '/graphql', {'query': query}, allow or {}
+
+
+EPISODE_FIELDS = '{ id title airDate colors { id name } subjects { id name } }'
+
+CASES = [
+    # REST: /api/episodes filters
+    rest('REST episodes color_id', '/api/episodes?color_id=3'),
+    rest('REST episodes subject_id', '/api/episodes?subject_id=5'),
+    rest('REST episodes season', '/api/episodes?season=7'),
+    rest('REST episodes episode', '/api/episodes?episode=4'),
+    rest('REST episodes season+episode', '/api/episodes?season=7&episode=4'),
+    rest('REST episodes title', '/api/episodes?title=mountain', {'episodes': SUBSTRING_SEARCH}),
+    rest('REST episodes aired_after', '/api/episodes?aired_after=1987-01-01'),
+    rest('REST episodes aired_before', '/api/episodes?aired_before=1984-01-01'),
+    rest('REST episodes aired range', '/api/episodes?aired_after=1987-01-01&aired_before=1987-12-31'),
+    rest('REST episodes color+subject', '/api/episodes?color_id=3&subject_id=5'),
+    rest('REST episodes color+season', '/api/episodes?color_id=3&season=7'),
+    rest('REST episodes color+aired', '/api/episodes?color_id=3&aired_after=1987-01-01&aired_before=1987-12-31'),
+    rest('REST episodes ids', '/api/episodes?ids=42,7,3'),
+    # REST: single resources and lists
+    rest('REST episode', '/api/episodes/42'),
+    rest('REST colors', '/api/colors'),
+    rest('REST color', '/api/colors/3'),
+    rest('REST subjects', '/api/subjects'),
+    rest('REST subject', '/api/subjects/5'),
+    rest('REST colors ids', '/api/colors?ids=5,1'),
+    rest('REST subjects ids', '/api/subjects?ids=9,2'),
+    ('REST batch', 'POST', '/api/batch', {'requests': [
+        {'path': '/api/episodes/1'}, {'path': '/api/episodes/2'}, {'path': '/api/colors/3'},
+        {'path': '/api/subjects/5'}, {'path': '/api/episodes?ids=14,13'},
+    ]}, {}),
+    # REST: derived views
+    rest('REST timeline', '/api/episodes/timeline?bucket=month&aired_after=1987-01-01&aired_before=1987-12-31'),
+    rest('REST timeline all years', '/api/episodes/timeline?bucket=year', {
+        'episode_colors': WHOLE_CATALOG, 'episode_subjects': WHOLE_CATALOG,
+    }),
+    rest('REST similar', '/api/episodes/42/similar?k=5', {
+        'episodes': INDEX_BUILD, 'episode_colors': INDEX_BUILD, 'episode_subjects': INDEX_BUILD,
+    }),
+    rest('REST palette', '/api/episodes/palette?hex=1A3D5C&hex=FFFFFF&k=5', {
+        'episodes': INDEX_BUILD, 'episode_colors': INDEX_BUILD,
+    }),
+    rest('REST nearest colors', '/api/colors/nearest?hex=1A3D5C&k=3'),
+    rest('REST cooccurrence', '/api/analytics/cooccurrence/color_subject'),
+    rest('REST frequency season', '/api/analytics/frequency/season'),
+    rest('REST frequency year', '/api/analytics/frequency/year'),
+    rest('REST distributions', '/api/analytics/distributions'),
+    rest('REST changes', '/api/changes?since=1&limit=50'),
+    # GraphQL
+    graphql('GraphQL allEpisodes colorId', f'{{ allEpisodes(colorId: 3) {EPISODE_FIELDS} }}'),
+    graphql('GraphQL allEpisodes subjectId', f'{{ allEpisodes(subjectId: 5) {EPISODE_FIELDS} }}'),
+    graphql('GraphQL allEpisodes season', f'{{ allEpisodes(season: 7) {EPISODE_FIELDS} }}'),
+    graphql('GraphQL allEpisodes episodeNum', f'{{ allEpisodes(episodeNum: 4) {EPISODE_FIELDS} }}'),
+    graphql('GraphQL allEpisodes title', f'{{ allEpisodes(title: "mountain") {EPISODE_FIELDS} }}',
+            {'episodes': SUBSTRING_SEARCH}),
+    graphql('GraphQL allEpisodes aired range',
+            f'{{ allEpisodes(airedAfter: "1987-01-01", airedBefore: "1987-12-31") {EPISODE_FIELDS} }}'),
+    graphql('GraphQL allEpisodes paged', f'{{ allEpisodes(season: 7, limit: 5, offset: 5) {EPISODE_FIELDS} }}'),
+    graphql('GraphQL episode', f'{{ episode(id: 42) {EPISODE_FIELDS} }}'),
+    graphql('GraphQL episodesByIds', f'{{ episodesByIds(ids: [42, 7, 3]) {EPISODE_FIELDS} }}'),
+    graphql('GraphQL allColors', '{ allColors { id name hex } }'),
+    graphql('GraphQL color', '{ color(id: 3) { id name hex } }'),
+    graphql('GraphQL allSubjects', '{ allSubjects { id name } }'),
+    graphql('GraphQL subject', '{ subject(id: 5) { id name } }'),
+    graphql('GraphQL timeline',
+            '{ timeline(bucket: "year", airedAfter: "1987-01-01", airedBefore: "1987-12-31") '
+            '{ bucket episodes colors { id } subjects { id } } }'),
+    graphql('GraphQL similarEpisodes', '{ similarEpisodes(id: 42, k: 5) { similarity episode { id } } }', {
+        'episodes': INDEX_BUILD, 'episode_colors': INDEX_BUILD, 'episode_subjects': INDEX_BUILD,
+    }),
+    graphql('GraphQL paletteEpisodes', '{ paletteEpisodes(hexes: ["#1A3D5C"], k: 5) { distance episode { id } } }', {
+        'episodes': INDEX_BUILD, 'episode_colors': INDEX_BUILD,
+    }),
+    graphql('GraphQL nearestColors', '{ nearestColors(hex: "#1A3D5C", k: 3) { distance color { id } } }'),
+    graphql('GraphQL cooccurrence', '{ cooccurrence(kind: "color_color") { kind counts } }'),
+    graphql('GraphQL periodFrequency', '{ periodFrequency(period: "year") { period episodes colors { id } } }'),
+    graphql('GraphQL distributions', '{ distributions { kind buckets { value count } } }'),
+    graphql('GraphQL changes', '{ changes(since: 1, limit: 50) { lastSeq changes { seq entity id op } } }'),
+]
+
+
+def capture_selects(run):
+    """Call `run()` and return the [(engine, statement, parameters)] SELECTs it executed."""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            captured.append((conn.engine, statement, parameters))
+
+    sa.event.listen(sa.engine.Engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        run()
+    finally:
+        sa.event.remove(sa.engine.Engine, 'before_cursor_execute', before_cursor_execute)
+    return captured
+
+
+class PlanChecker:
+    """EXPLAINs captured statements and reports scans and sorts over the thresholds."""
+
+    def __init__(self, max_scan_rows=MAX_SCAN_ROWS, max_sort_rows=MAX_SORT_ROWS):
+        self.max_scan_rows = max_scan_rows
+        self.max_sort_rows = max_sort_rows
+        self.tables = set(db.metadata.tables)
+        self._counts = {}
+
+    def _table(self, statement, name):
+        """Resolve a plan alias (e.g. episode_colors_1) to its table, or None for subqueries."""
+        aliases = {alias: table for table, alias in re.findall(r'\b(\w+) AS (\w+)\b', statement)}
+        name = aliases.get(name, name)
+        return name if name in self.tables else None
+
+    def _count(self, conn, table):
+        if table not in self._counts:
+            self._counts[table] = conn.execute(sa.select(sa.func.count()).select_from(sa.table(table))).scalar()
+        return self._counts[table]
+
+    def explain(self, engine, statement, parameters):
+        """
+        ([(table, rows)] fully scanned, [(sort, rows)] sorts, raw plan), where a
+        sort's rows are those of the largest table the statement reads.
+        """
+        scans, sorts, read = [], [], {}
+        with engine.connect() as conn:
+            if engine.dialect.name == 'sqlite':
+                plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+                for detail in plan:
+                    # 'SCAN episodes', 'SEARCH episodes USING INDEX ...', 'USE TEMP B-TREE FOR ORDER BY'
+                    match = re.match(r'(SCAN|SEARCH)(?: TABLE)? (\w+)', detail)
+                    table = match and self._table(statement, match.group(2))
+                    if table:
+                        read[table] = self._count(conn, table)
+                        if match.group(1) == 'SCAN':
+                            scans.append((table, read[table]))
+                    elif detail.startswith('USE TEMP B-TREE'):
+                        sorts.append(detail)
+            else:
+                plan = [dict(row) for row in conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).mappings()]
+                for row in plan:
+                    table = self._table(statement, row['table'] or '')
+                    extra = row.get('Extra') or ''
+                    if table:
+                        read[table] = max(read.get(table, 0), row['rows'] or 0)
+                        # ALL is a table scan, index a full index scan
+                        if row['type'] in ('ALL', 'index'):
+                            scans.append((table, row['rows'] or 0))
+                    sorts.extend(s for s in ('Using filesort', 'Using temporary') if s in extra)
+        largest = max(read.values(), default=0)
+        return scans, [(sort, largest) for sort in sorts], plan
+
+    def problems(self, engine, statement, parameters, allow):
+        scans, sorts, plan = self.explain(engine, statement, parameters)
+        found = [
+            f"full scan of {table} ({rows} rows)"
+            for table, rows in scans if rows > self.max_scan_rows and table not in allow
+        ]
+        found.extend(f"{sort} over {rows} rows" for sort, rows in sorts if rows > self.max_sort_rows)
+        return found, plan
+
+
+def run_case(app, method, path, body):
+    """
+    (response, captured SELECTs) of one request from a fresh client. The login
+    runs first and outside the capture; the request pushes its own contexts.
+    """
+    client = app.test_client()
+    login = client.post('/login', json=LOGIN)
+    if login.status_code != 200:
+        return login, []
+    headers = {'Authorization': f"Bearer {login.get_json()['token']}"}
+    responses = []
+    captured = capture_selects(lambda: responses.append(
+        client.open(path, method=method, json=body, headers=headers)
+    ))
+    return responses[0], captured
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EXPLAIN every API read path against the configured database.")
+    parser.add_argument('--max-scan-rows', type=int, default=MAX_SCAN_ROWS,
+                        help="fail on full scans of tables larger than this")
+    parser.add_argument('--max-sort-rows', type=int, default=MAX_SORT_ROWS,
+                        help="fail on sorts while reading tables larger than this")
+    args = parser.parse_args(argv)
+
+    if api_app.read_model is not None:
+        print("COLUMNAR_SNAPSHOT is set; the read paths do not query the database.")
+        return 1
+    app = api_app.app
+    checker = PlanChecker(args.max_scan_rows, args.max_sort_rows)
+
+    failures = 0
+    for name, method, path, body, allow in CASES:
+        response, captured = run_case(app, method, path, body)
+        if response.status_code != 200 or (body and response.get_json().get('errors')):
+            print(f"FAIL {name}: {method} {path} returned {response.status_code} {response.get_data(as_text=True)[:200]}")
+            failures += 1
+            continue
+        case_failed = False
+        for engine, statement, parameters in captured:
+            found, plan = checker.problems(engine, statement, parameters, allow)
+            if found:
+                case_failed = True
+                print(f"FAIL {name}: {'; '.join(found)}")
+                print(f"  {' '.join(statement.split())}")
+                for row in plan:
+                    print(f"    {row}")
+        if case_failed:
+            failures += 1
+        else:
+            print(f"ok   {name} ({len(captured)} queries)")
+
+    print(f"{len(CASES) - failures}/{len(CASES)} read paths passed")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
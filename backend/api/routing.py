@@ -0,0 +1,252 @@
+# backend/api/routing.py
+import itertools
+import threading
+import time
+
+import sqlalchemy as sa
+from flask import has_request_context, jsonify, request
+from flask_sqlalchemy.session import Session
+from graphql import GraphQLError
+from graphql.language import OperationType, parse
+
+from config import REPLICA_RETRY_AFTER, SNAPSHOT_MMAP_SIZE
+
+# Methods that never write; everything else is routed to the primary
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+# WSGI environ key overriding the method-based choice for one request. Not
+# flask.g: that belongs to the app context, which a later request reuses when
+# one is already pushed.
+USE_PRIMARY = 'routing.use_primary'
+
+
+class ReplicaSet:
+    """
+    Round-robin selection over the configured read replica bind keys.
+    A replica that fails a check or raises a connection error is taken out
+    of rotation for `retry_after` seconds. It is checked again before it
+    serves its first request after that (and before its very first one).
+    """
+
+    def __init__(self, keys=(), retry_after=REPLICA_RETRY_AFTER):
+        self.keys = list(keys)
+        self.retry_after = retry_after
+        self._down_until = {}
+        self._verified = set()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def is_healthy(self, key):
+        return self._down_until.get(key, 0) <= time.monotonic()
+
+    def mark_down(self, key):
+        with self._lock:
+            self._down_until[key] = time.monotonic() + self.retry_after
+            self._verified.discard(key)
+
+    def mark_up(self, key):
+        with self._lock:
+            self._down_until.pop(key, None)
+            self._verified.add(key)
+
+    def choose(self, check=None):
+        """
+        Return the next healthy replica key, or None if none is available.
+        A replica not verified since it was last down is first passed to
+        `check(key)`; if that returns False it is marked down and the next
+        one is tried, so a dead replica never fails a request twice.
+        """
+        if not self.keys:
+            return None
+        start = next(self._counter)
+        for offset in range(len(self.keys)):
+            key = self.keys[(start + offset) % len(self.keys)]
+            if not self.is_healthy(key):
+                continue
+            if check is None or key in self._verified:
+                return key
+            if check(key):
+                self.mark_up(key)
+                return key
+            self.mark_down(key)
+        return None
+
+    def status(self):
+        return {key: ('up' if self.is_healthy(key) else 'down') for key in self.keys}
+
+
+replicas = ReplicaSet()
+
+
+def use_primary():
+    """Route every remaining query of the current request to the primary."""
+    if has_request_context():
+        request.environ[USE_PRIMARY] = True
+
+
+def wants_primary():
+    if not has_request_context():
+        # CLI commands, scripts and app startup always talk to the primary
+        return True
+    return request.environ.get(USE_PRIMARY, request.method not in READ_METHODS)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a read replica and writes to the primary.
+    The replica is picked once per session (i.e. per request) so a request
+    sees a consistent view; flushes always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+        if self._flushing or isinstance(clause, sa.UpdateBase) or wants_primary():
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+        key = self.info.get('replica_key')
+        if key is None or not replicas.is_healthy(key):
+            # Replicas in rotation are used without a test connection: one
+            # that fails is marked down by _watch_replica, and pool_pre_ping
+            # weeds out stale connections
+            key = replicas.choose(lambda candidate: is_reachable(self._db.engines[candidate]))
+            self.info['replica_key'] = key
+        if key is None:
+            # No replicas configured or all of them are down: fail over to primary
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        return self._db.engines[key]
+
+
+def _is_mutation(payload):
+    try:
+        document = parse(payload.get('query') or '')
+    except (GraphQLError, AttributeError):
+        # Let the GraphQL view report the error; route it to the primary to be safe
+        return True
+    return any(
+        getattr(node, 'operation', None) == OperationType.MUTATION
+        for node in document.definitions
+    )
+
+
+def is_graphql_mutation(req):
+    """True if the GraphQL document in the request contains a mutation."""
+    return _is_mutation(req.get_json(silent=True) or req.form or req.args)
+
+
+def is_batch_write(req, graphql_path):
+    """True if any sub-request of a /api/batch call writes."""
+    payload = req.get_json(silent=True)
+    subrequests = payload.get('requests') if isinstance(payload, dict) else None
+    if not isinstance(subrequests, list):
+        # Rejected by the batch endpoint before it touches the database
+        return False
+    for sub in subrequests:
+        if not isinstance(sub, dict):
+            continue
+        method = str(sub.get('method', 'GET')).upper()
+        path = str(sub.get('path', '')).split('?', 1)[0]
+        if method in READ_METHODS:
+            continue
+        if path != graphql_path or _is_mutation(sub.get('body') or {}):
+            return True
+    return False
+
+
+def init_routing(app, db, graphql_path='/graphql', batch_path='/api/batch', read_only=False,
+                 read_only_exempt=('/login',)):
+    """
+    Register replica keys, request routing and failure listeners.
+    With `read_only` (serving from an ETL snapshot) every request that
+    would need the primary is rejected with a 405.
+    """
+    keys = sorted(k for k in app.config.get('SQLALCHEMY_BINDS', {}) if k.startswith('replica_'))
+    replicas.keys = keys
+
+    @app.before_request
+    def route_request():
+        # GraphQL queries arrive as POSTs too; only mutations need the primary
+        if request.path == graphql_path and request.method not in READ_METHODS:
+            request.environ[USE_PRIMARY] = is_graphql_mutation(request)
+        # A batch is routed as a whole: to the primary if any sub-request writes
+        if request.path == batch_path and request.method not in READ_METHODS:
+            request.environ[USE_PRIMARY] = is_batch_write(request, graphql_path)
+        if read_only and request.path not in read_only_exempt and wants_primary():
+            return jsonify({'message': 'API is running in read-only snapshot mode'}), 405
+
+    with app.app_context():
+        for key in keys:
+            _watch_replica(db.engines[key], key)
+
+
+def _watch_replica(engine, key):
+    @sa.event.listens_for(engine, 'handle_error')
+    def on_error(context):
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, sa.exc.OperationalError):
+            replicas.mark_down(key)
+
+
+def tune_snapshot_engine(app, db):
+    """Memory-map the SQLite snapshot and refuse writes on every connection."""
+    with app.app_context():
+        engine = db.engine
+
+    @sa.event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        # Each worker maps the file itself after fork; pages are shared via the OS cache
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA mmap_size = {SNAPSHOT_MMAP_SIZE}')
+        cursor.execute('PRAGMA query_only = ON')
+        cursor.close()
+
+
+# ===== Pool metrics =====
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+
+def pool_metrics(db):
+    """Pool statistics for the primary and every replica engine."""
+    metrics = {'primary': pool_stats(db.engine)}
+    health = replicas.status()
+    for key in replicas.keys:
+        stats = pool_stats(db.engines[key])
+        stats['status'] = health[key]
+        metrics[key] = stats
+    return metrics
+
+
+def is_reachable(engine):
+    """Run SELECT 1 on a pooled connection of `engine`."""
+    try:
+        with engine.connect() as conn:
+            conn.execute(sa.text('SELECT 1'))
+    except sa.exc.DBAPIError:
+        return False
+    return True
+
+
+def probe_replicas(db):
+    """Run SELECT 1 on every replica and update its health accordingly."""
+    for key in replicas.keys:
+        if is_reachable(db.engines[key]):
+            replicas.mark_up(key)
+        else:
+            replicas.mark_down(key)
+
+
+def reset_pools(app, db, close=True):
+    """
+    Drop the pooled connections of every engine; new ones are opened on demand.
+    A forked worker passes close=False: the connections it inherited belong
+    to the parent, so they are discarded without touching their sockets.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
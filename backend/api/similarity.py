@@ -0,0 +1,194 @@
+# backend/api/similarity.py
+from collections import defaultdict
+
+import numpy as np
+import sqlalchemy as sa
+
+from config import SIMILAR_LSH_MIN_EPISODES
+from index_cache import IndexCache
+from models import db, Episode, Color, Subject, episode_colors, episode_subjects
+
+METRICS = ('jaccard', 'cosine', 'weighted')
+
+
+class MinHashLSH:
+    """
+    MinHash signatures with banded LSH buckets over the episode feature sets.
+    Used to narrow the candidates once the catalog is too large to score
+    every episode sharing a feature with the query.
+    """
+
+    PRIME = (1 << 31) - 1
+
+    def __init__(self, indptr, indices, num_perm=64, bands=16, seed=0):
+        rng = np.random.default_rng(seed)
+        self.rows_per_band = num_perm // bands
+        self.bands = bands
+        self._a = rng.integers(1, self.PRIME, size=num_perm, dtype=np.int64)
+        self._b = rng.integers(0, self.PRIME, size=num_perm, dtype=np.int64)
+
+        n = len(indptr) - 1
+        signatures = np.full((n, num_perm), self.PRIME, dtype=np.int64)
+        nonempty = np.flatnonzero(np.diff(indptr) > 0)
+        if len(indices):
+            hashes = (np.outer(indices, self._a) + self._b) % self.PRIME
+            signatures[nonempty] = np.minimum.reduceat(hashes, indptr[nonempty], axis=0)
+        self.signatures = signatures
+
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+        for band, buckets in enumerate(self._buckets):
+            keys = self._band(signatures, band)
+            for row, key in enumerate(keys):
+                buckets[key.tobytes()].append(row)
+
+    def _band(self, signatures, band):
+        start = band * self.rows_per_band
+        return np.ascontiguousarray(signatures[..., start:start + self.rows_per_band])
+
+    def candidates(self, row):
+        rows = set()
+        for band, buckets in enumerate(self._buckets):
+            rows.update(buckets.get(self._band(self.signatures[row], band).tobytes(), ()))
+        rows.discard(row)
+        return np.array(sorted(rows), dtype=np.int64)
+
+
+class SimilarityIndex:
+    """
+    Episode feature sets (colors followed by subjects) stored twice: CSR by
+    episode and as inverted posting lists by feature. A query only touches the
+    postings of its own features, so it never scans all episode pairs.
+    """
+
+    def __init__(self, episode_ids, indptr, indices, n_features, lsh_min_episodes=SIMILAR_LSH_MIN_EPISODES):
+        self.episode_ids = np.asarray(episode_ids, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        n = len(self.episode_ids)
+        rows = np.repeat(np.arange(n), np.diff(self.indptr))
+
+        # Inverted index: feature -> episode rows
+        order = np.argsort(self.indices, kind='stable')
+        self.postings = rows[order]
+        self.posting_ptr = np.zeros(n_features + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=n_features), out=self.posting_ptr[1:])
+
+        # Rare features count more in the weighted metric (squared IDF)
+        df = np.diff(self.posting_ptr)
+        idf = np.log((1 + n) / (1 + df)) + 1
+        self.weights = idf ** 2
+        self.sizes = np.diff(self.indptr).astype(np.float64)
+        self.weighted_norms = np.sqrt(np.bincount(rows, weights=self.weights[self.indices], minlength=n))
+
+        self.lsh = MinHashLSH(self.indptr, self.indices) if n >= lsh_min_episodes else None
+
+    def row(self, episode_id):
+        pos = int(np.searchsorted(self.episode_ids, episode_id))
+        if pos < len(self.episode_ids) and self.episode_ids[pos] == episode_id:
+            return pos
+        return None
+
+    def _overlap(self, features, weights):
+        """Shared (weighted) feature count between the query and every episode."""
+        spans = [np.arange(self.posting_ptr[f], self.posting_ptr[f + 1]) for f in features]
+        hits = np.concatenate(spans) if spans else np.empty(0, dtype=np.int64)
+        hit_weights = None if weights is None else np.repeat(weights[features], np.diff(self.posting_ptr)[features])
+        return np.bincount(self.postings[hits], weights=hit_weights, minlength=len(self.episode_ids))
+
+    def _candidate_overlap(self, candidates, features, weights):
+        starts, ends = self.indptr[candidates], self.indptr[candidates + 1]
+        lengths = ends - starts
+        owner = np.repeat(np.arange(len(candidates)), lengths)
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        feats = self.indices[positions]
+        mask = np.isin(feats, features)
+        hit_weights = None if weights is None else weights[feats[mask]]
+        return np.bincount(owner[mask], weights=hit_weights, minlength=len(candidates))
+
+    def top_k(self, episode_id, k=10, metric='jaccard'):
+        """[(episode_id, score)] best first, or None if the episode is unknown."""
+        row = self.row(episode_id)
+        if row is None:
+            return None
+        features = self.indices[self.indptr[row]:self.indptr[row + 1]]
+        weights = self.weights if metric == 'weighted' else None
+
+        if self.lsh is not None:
+            candidates = self.lsh.candidates(row)
+            overlap = self._candidate_overlap(candidates, features, weights)
+        else:
+            candidates = np.flatnonzero(np.arange(len(self.episode_ids)) != row)
+            overlap = self._overlap(features, weights)[candidates]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if metric == 'jaccard':
+                union = self.sizes[candidates] + self.sizes[row] - overlap
+                scores = overlap / union
+            elif metric == 'cosine':
+                scores = overlap / np.sqrt(self.sizes[candidates] * self.sizes[row])
+            else:
+                scores = overlap / (self.weighted_norms[candidates] * self.weighted_norms[row])
+        scores = np.nan_to_num(scores)
+
+        if len(scores) > k:
+            # Keep everything tied with the k-th score so ties break by id
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            keep = np.flatnonzero(scores >= kth)
+            candidates, scores = candidates[keep], scores[keep]
+        ids = self.episode_ids[candidates]
+        order = np.lexsort((ids, -scores))[:k]
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+
+# ===== Index lifecycle =====
+
+def _build(episode_ids, rows, features, n_features):
+    """Index from parallel arrays of episode row positions and feature numbers."""
+    order = np.lexsort((features, rows))
+    indptr = np.zeros(len(episode_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(episode_ids)), out=indptr[1:])
+    return SimilarityIndex(episode_ids, indptr, features[order], n_features)
+
+
+def _from_read_model(read_model):
+    n_colors = len(read_model.color_id)
+    n = len(read_model.episode_id)
+    rows, features = [], []
+    for indptr, indices, offset in (
+        (read_model.episode_colors_indptr, read_model.episode_colors_indices, 0),
+        (read_model.episode_subjects_indptr, read_model.episode_subjects_indices, n_colors),
+    ):
+        rows.append(np.repeat(np.arange(n), np.diff(indptr)))
+        features.append(indices.astype(np.int64) + offset)
+    return _build(
+        read_model.episode_id, np.concatenate(rows), np.concatenate(features),
+        n_colors + len(read_model.subject_id)
+    )
+
+
+def _from_database():
+    session = db.session
+    episode_ids = np.array(session.execute(sa.select(Episode.id).order_by(Episode.id)).scalars().all(), dtype=np.int64)
+    color_ids = np.array(session.execute(sa.select(Color.id).order_by(Color.id)).scalars().all(), dtype=np.int64)
+    subject_ids = np.array(session.execute(sa.select(Subject.id).order_by(Subject.id)).scalars().all(), dtype=np.int64)
+
+    rows, features = [], []
+    for table, column, ids, offset in (
+        (episode_colors, episode_colors.c.color_id, color_ids, 0),
+        (episode_subjects, episode_subjects.c.subject_id, subject_ids, len(color_ids)),
+    ):
+        links = np.array(session.execute(sa.select(table.c.episode_id, column)).all(), dtype=np.int64).reshape(-1, 2)
+        row = np.searchsorted(episode_ids, links[:, 0])
+        col = np.searchsorted(ids, links[:, 1])
+        valid = (row < len(episode_ids)) & (col < len(ids))
+        valid[valid] &= (episode_ids[row[valid]] == links[valid, 0]) & (ids[col[valid]] == links[valid, 1])
+        rows.append(row[valid])
+        features.append(col[valid] + offset)
+    return _build(episode_ids, np.concatenate(rows), np.concatenate(features), len(color_ids) + len(subject_ids))
+
+
+index_cache = IndexCache(_from_database, _from_read_model)
+
+
+def similar_episodes(episode_id, k=10, metric='jaccard', read_model=None):
+    return index_cache.get(read_model).top_k(episode_id, k, metric)
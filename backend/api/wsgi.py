@@ -0,0 +1,42 @@
+# backend/api/wsgi.py
+"""
+Application factory for gunicorn (see gunicorn.conf.py):
+
+    gunicorn -c gunicorn.conf.py 'wsgi:create_app()'
+
+With PRELOAD (the default) gunicorn calls the factory once in the master:
+the imports, the GraphQL schema, the columnar snapshot mapping and a round
+of warm-up requests all happen there, and every worker is forked with them
+already in memory. The objects are frozen out of the garbage collector
+first, so collections in the workers do not write to (and so copy) the
+pages they share with the master. Database pools are emptied before the
+fork and filled by each worker on its own.
+"""
+import gc
+
+from dotenv import load_dotenv
+
+
+def create_app(preload=None):
+    # Before config is imported: it reads the environment at import time
+    load_dotenv()
+    from config import PRELOAD
+    if preload is None:
+        preload = PRELOAD
+    if preload:
+        # Objects freed during startup would leave holes in shared pages that
+        # the workers' own allocations then fill (and copy)
+        gc.disable()
+
+    from app import app, warm_up
+
+    if preload:
+        try:
+            warm_up()
+        except Exception:
+            # The master must start anyway; /health reports a missing database
+            app.logger.exception("Warm-up failed, workers start cold")
+        finally:
+            gc.freeze()
+            gc.enable()
+    return app
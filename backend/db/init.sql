@@ -1,11 +1,15 @@
 -- backend/db/init.sql
+-- Safe to re-run: run_etl.py applies it before every load and then adds
+-- indexes that tables created by an older version are missing
+-- (SCHEMA_INDEXES in run_etl.py, or `python run_etl.py --schema-only`).
+-- run_etl.py splits this file on semicolons, so comments must not contain any.
 
 -- Create the database
 CREATE DATABASE IF NOT EXISTS `atlas_the_joy_of_painting_db`;
 USE `atlas_the_joy_of_painting_db`;
 
 -- 1. Episodes table
-CREATE TABLE `episodes` (
+CREATE TABLE IF NOT EXISTS `episodes` (
     `id` INT NOT NULL AUTO_INCREMENT,
     `title` VARCHAR(255) NOT NULL,
     `season` INT,
@@ -16,11 +20,13 @@ CREATE TABLE `episodes` (
     `num_colors` INT,
     `extra_info` JSON,
     PRIMARY KEY (`id`),
-    UNIQUE KEY `unique_episode` (`season`, `episode`)
+    UNIQUE KEY `unique_episode` (`season`, `episode`),
+    KEY `idx_episodes_episode` (`episode`),
+    KEY `idx_episodes_air_date` (`air_date`)
 );
 
 -- 2. Colors table
-CREATE TABLE `colors` (
+CREATE TABLE IF NOT EXISTS `colors` (
     `id` INT NOT NULL AUTO_INCREMENT,
     `name` VARCHAR(255) NOT NULL UNIQUE,
     `hex` VARCHAR(7) NOT NULL UNIQUE,
@@ -28,26 +34,74 @@ CREATE TABLE `colors` (
 );
 
 -- 3. Subjects table
-CREATE TABLE `subjects` (
+CREATE TABLE IF NOT EXISTS `subjects` (
     `id` INT NOT NULL AUTO_INCREMENT,
     `name` VARCHAR(255) NOT NULL UNIQUE,
     PRIMARY KEY (`id`)
 );
 
 -- 4. Episode_Colors junction table
-CREATE TABLE `episode_colors` (
+CREATE TABLE IF NOT EXISTS `episode_colors` (
     `episode_id` INT NOT NULL,
     `color_id` INT NOT NULL,
     PRIMARY KEY (`episode_id`, `color_id`),
+    KEY `idx_episode_colors_color` (`color_id`, `episode_id`),
     FOREIGN KEY (`episode_id`) REFERENCES `episodes`(`id`) ON DELETE CASCADE,
     FOREIGN KEY (`color_id`) REFERENCES `colors`(`id`) ON DELETE CASCADE
 );
 
 -- 5. Episode_Subjects junction table
-CREATE TABLE `episode_subjects` (
+CREATE TABLE IF NOT EXISTS `episode_subjects` (
     `episode_id` INT NOT NULL,
     `subject_id` INT NOT NULL,
     PRIMARY KEY (`episode_id`, `subject_id`),
+    KEY `idx_episode_subjects_subject` (`subject_id`, `episode_id`),
     FOREIGN KEY (`episode_id`) REFERENCES `episodes`(`id`) ON DELETE CASCADE,
     FOREIGN KEY (`subject_id`) REFERENCES `subjects`(`id`) ON DELETE CASCADE
 );
+
+-- 6. Materialized analytics (built by the ETL, kept current by the API on writes)
+-- Symmetric matrices (color_color, subject_subject) store only a_id <= b_id
+CREATE TABLE IF NOT EXISTS `analytics_cooccurrence` (
+    `kind` VARCHAR(32) NOT NULL,
+    `a_id` INT NOT NULL,
+    `b_id` INT NOT NULL,
+    `count` INT NOT NULL,
+    PRIMARY KEY (`kind`, `a_id`, `b_id`)
+);
+
+-- Per season/year counts, item_kind is color, subject, episode or num_colors
+CREATE TABLE IF NOT EXISTS `analytics_period_frequency` (
+    `period` VARCHAR(8) NOT NULL,
+    `period_value` INT NOT NULL,
+    `item_kind` VARCHAR(16) NOT NULL,
+    `item_id` INT NOT NULL,
+    `count` INT NOT NULL,
+    PRIMARY KEY (`period`, `period_value`, `item_kind`, `item_id`)
+);
+
+CREATE TABLE IF NOT EXISTS `analytics_distribution` (
+    `kind` VARCHAR(32) NOT NULL,
+    `value` INT NOT NULL,
+    `count` INT NOT NULL,
+    PRIMARY KEY (`kind`, `value`)
+);
+
+-- 7. Change feed (appended to by the API on every write and by the ETL)
+-- op is create, update or delete, and the ETL appends ('catalog', 0, 'reload')
+CREATE TABLE IF NOT EXISTS `change_log` (
+    `seq` BIGINT NOT NULL,
+    `entity` VARCHAR(16) NOT NULL,
+    `entity_id` INT NOT NULL,
+    `op` VARCHAR(8) NOT NULL,
+    `changed_at` DATETIME NOT NULL,
+    PRIMARY KEY (`seq`)
+);
+
+-- Single counter row (id 1). Writers lock it, so seq order is commit order
+CREATE TABLE IF NOT EXISTS `change_seq` (
+    `id` INT NOT NULL,
+    `seq` BIGINT NOT NULL,
+    PRIMARY KEY (`id`)
+);
+INSERT IGNORE INTO `change_seq` (`id`, `seq`) VALUES (1, 0);
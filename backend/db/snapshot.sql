@@ -0,0 +1,90 @@
+-- backend/db/snapshot.sql
+-- SQLite schema for the read-only snapshot written by run_etl.py.
+-- Mirrors init.sql; the API opens the file immutable, so all indexes
+-- needed by the read paths must be created here.
+
+-- 1. Episodes table
+CREATE TABLE `episodes` (
+    `id` INTEGER NOT NULL PRIMARY KEY,
+    `title` VARCHAR(255) NOT NULL,
+    `season` INTEGER,
+    `episode` INTEGER,
+    `air_date` DATE,
+    `youtube_src` VARCHAR(255),
+    `img_src` VARCHAR(255),
+    `num_colors` INTEGER,
+    `extra_info` JSON
+);
+CREATE UNIQUE INDEX `unique_episode` ON `episodes` (`season`, `episode`);
+CREATE INDEX `idx_episodes_episode` ON `episodes` (`episode`);
+CREATE INDEX `idx_episodes_air_date` ON `episodes` (`air_date`);
+
+-- 2. Colors table
+CREATE TABLE `colors` (
+    `id` INTEGER NOT NULL PRIMARY KEY,
+    `name` VARCHAR(255) NOT NULL UNIQUE,
+    `hex` VARCHAR(7) NOT NULL UNIQUE
+);
+
+-- 3. Subjects table
+CREATE TABLE `subjects` (
+    `id` INTEGER NOT NULL PRIMARY KEY,
+    `name` VARCHAR(255) NOT NULL UNIQUE
+);
+
+-- 4. Episode_Colors junction table
+CREATE TABLE `episode_colors` (
+    `episode_id` INTEGER NOT NULL REFERENCES `episodes`(`id`),
+    `color_id` INTEGER NOT NULL REFERENCES `colors`(`id`),
+    PRIMARY KEY (`episode_id`, `color_id`)
+) WITHOUT ROWID;
+CREATE INDEX `idx_episode_colors_color` ON `episode_colors` (`color_id`, `episode_id`);
+
+-- 5. Episode_Subjects junction table
+CREATE TABLE `episode_subjects` (
+    `episode_id` INTEGER NOT NULL REFERENCES `episodes`(`id`),
+    `subject_id` INTEGER NOT NULL REFERENCES `subjects`(`id`),
+    PRIMARY KEY (`episode_id`, `subject_id`)
+) WITHOUT ROWID;
+CREATE INDEX `idx_episode_subjects_subject` ON `episode_subjects` (`subject_id`, `episode_id`);
+
+-- 6. Materialized analytics (built by the ETL, kept current by the API on writes)
+-- Symmetric matrices (color_color, subject_subject) store only a_id <= b_id
+CREATE TABLE `analytics_cooccurrence` (
+    `kind` VARCHAR(32) NOT NULL,
+    `a_id` INTEGER NOT NULL,
+    `b_id` INTEGER NOT NULL,
+    `count` INTEGER NOT NULL,
+    PRIMARY KEY (`kind`, `a_id`, `b_id`)
+) WITHOUT ROWID;
+
+-- Per season/year counts; item_kind is color, subject, episode or num_colors
+CREATE TABLE `analytics_period_frequency` (
+    `period` VARCHAR(8) NOT NULL,
+    `period_value` INTEGER NOT NULL,
+    `item_kind` VARCHAR(16) NOT NULL,
+    `item_id` INTEGER NOT NULL,
+    `count` INTEGER NOT NULL,
+    PRIMARY KEY (`period`, `period_value`, `item_kind`, `item_id`)
+) WITHOUT ROWID;
+
+CREATE TABLE `analytics_distribution` (
+    `kind` VARCHAR(32) NOT NULL,
+    `value` INTEGER NOT NULL,
+    `count` INTEGER NOT NULL,
+    PRIMARY KEY (`kind`, `value`)
+) WITHOUT ROWID;
+
+-- 7. Change feed: a snapshot only holds the reload entry it was built by
+CREATE TABLE `change_log` (
+    `seq` INTEGER NOT NULL PRIMARY KEY,
+    `entity` VARCHAR(16) NOT NULL,
+    `entity_id` INTEGER NOT NULL,
+    `op` VARCHAR(8) NOT NULL,
+    `changed_at` DATETIME NOT NULL
+);
+
+CREATE TABLE `change_seq` (
+    `id` INTEGER NOT NULL PRIMARY KEY,
+    `seq` INTEGER NOT NULL
+);
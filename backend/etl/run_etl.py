@@ -1,12 +1,16 @@
 # backend/etl/run_etl.py
 import pandas as pd
+import numpy as np
 import re
 import ast
+import argparse
 from datetime import datetime
 import json
 import mysql.connector
 from mysql.connector import errorcode
 import os
+import sqlite3
+import struct
 import time
 
 from dotenv import load_dotenv
@@ -57,9 +61,32 @@ def wait_for_db(retries=10, delay=5):
     print("❌ Failed to connect to the database after multiple retries.")
     return False
 
+# Secondary indexes added after the first release of init.sql. CREATE TABLE
+# IF NOT EXISTS leaves existing tables alone, so these are added separately.
+SCHEMA_INDEXES = [
+    ('episodes', 'idx_episodes_episode', '`episode`'),
+    ('episodes', 'idx_episodes_air_date', '`air_date`'),
+    ('episode_colors', 'idx_episode_colors_color', '`color_id`, `episode_id`'),
+    ('episode_subjects', 'idx_episode_subjects_subject', '`subject_id`, `episode_id`'),
+]
+
+def add_missing_indexes(cursor):
+    """Adds the SCHEMA_INDEXES a database created by an older init.sql lacks."""
+    cursor.execute(
+        "SELECT DISTINCT table_name, index_name FROM information_schema.statistics WHERE table_schema = %s",
+        (DB_NAME,)
+    )
+    existing = {(table.lower(), index) for table, index in cursor.fetchall()}
+    for table, index, columns in SCHEMA_INDEXES:
+        if (table, index) not in existing:
+            print(f"...Adding index {index} to {table}...")
+            cursor.execute(f"ALTER TABLE `{table}` ADD INDEX `{index}` ({columns})")
+
 def create_database_schema():
     """
     Connects to MySQL and executes the SQL script to create the database and tables.
+    Also upgrades a database created by an older version: missing tables are
+    created, missing indexes added and the change feed counter seeded.
     """
     print("...Checking for database schema...")
     if not wait_for_db():
@@ -95,6 +122,7 @@ def create_database_schema():
         commands = [cmd for cmd in sql_commands.split(';') if cmd.strip()]
         for command in commands:
             cursor.execute(command)
+        add_missing_indexes(cursor)
         
         cnx.commit()
         cursor.close()
@@ -165,13 +193,341 @@ def get_subject_data(file_path):
     subject_df["TITLE"] = subject_df["TITLE"].str.replace('"', '', regex=False).str.strip()
     return subject_df
 
-def run_etl():
+# Column order of the rows returned by compute_analytics()
+ANALYTICS_COLUMNS = {
+    'analytics_cooccurrence': ('kind', 'a_id', 'b_id', 'count'),
+    'analytics_period_frequency': ('period', 'period_value', 'item_kind', 'item_id', 'count'),
+    'analytics_distribution': ('kind', 'value', 'count'),
+}
+
+def insert_analytics_query(table, placeholder):
+    columns = ANALYTICS_COLUMNS[table]
+    return (
+        f"INSERT INTO {table} ({', '.join(f'`{c}`' for c in columns)}) "
+        f"VALUES ({', '.join([placeholder] * len(columns))})"
+    )
+
+def write_sqlite_snapshot(snapshot_path, colors, subjects, episodes, episode_colors, episode_subjects, analytics,
+                          change_seq):
+    """
+    Writes the cleaned data to a standalone SQLite file for the API's read-only mode.
+    The file is built next to the target and renamed into place, so workers
+    that have the previous snapshot open are never served a half-written file.
+    """
+    print(f"...Writing SQLite snapshot to {snapshot_path}...")
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(script_dir, '..', 'db', 'snapshot.sql'), 'r') as f:
+        schema = f.read()
+
+    tmp_path = f"{snapshot_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    cnx = sqlite3.connect(tmp_path)
+    try:
+        cnx.executescript(schema)
+        cnx.executemany("INSERT INTO colors (id, name, hex) VALUES (?, ?, ?)", colors)
+        cnx.executemany("INSERT INTO subjects (id, name) VALUES (?, ?)", subjects)
+        cnx.executemany(
+            """
+            INSERT INTO episodes (id, title, season, episode, air_date, youtube_src, img_src, num_colors, extra_info)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            episodes
+        )
+        cnx.executemany("INSERT INTO episode_colors (episode_id, color_id) VALUES (?, ?)", sorted(episode_colors))
+        cnx.executemany("INSERT INTO episode_subjects (episode_id, subject_id) VALUES (?, ?)", sorted(episode_subjects))
+        for table, rows in analytics.items():
+            cnx.executemany(insert_analytics_query(table, '?'), rows)
+        cnx.execute("INSERT INTO change_seq (id, seq) VALUES (1, ?)", (change_seq,))
+        cnx.execute(INSERT_RELOAD_QUERY.replace('%s', '?'), (change_seq, datetime.utcnow()))
+        cnx.commit()
+        # Planner statistics and a compact file: the API can never write to it later
+        cnx.execute("ANALYZE")
+        cnx.execute("VACUUM")
+    finally:
+        cnx.close()
+
+    os.replace(tmp_path, snapshot_path)
+    print("...SQLite snapshot written.")
+
+# Columnar snapshot format; see backend/api/columnar.py for the reader
+COLUMNAR_MAGIC = b'JOYCOL01'
+COLUMNAR_ALIGN = 64
+
+def _string_column(values):
+    """utf-8 blob plus int32 offsets; None is stored as an empty string."""
+    encoded = [(v or '').encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype='<i4')
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+def _csr(pairs, row_ids, col_ids):
+    """CSR arrays for (row_id, col_id) pairs, with rows/cols as positions."""
+    row_pos = {rid: i for i, rid in enumerate(row_ids)}
+    col_pos = {cid: j for j, cid in enumerate(col_ids)}
+    links = sorted((row_pos[r], col_pos[c]) for r, c in pairs if r in row_pos and c in col_pos)
+    indptr = np.zeros(len(row_ids) + 1, dtype='<i4')
+    np.add.at(indptr, [r + 1 for r, _ in links], 1)
+    indptr = np.cumsum(indptr, dtype='<i4')
+    indices = np.array([c for _, c in links], dtype='<i4')
+    return indptr, indices
+
+def write_columnar_snapshot(snapshot_path, colors, subjects, episodes, episode_colors, episode_subjects, change_seq):
+    """
+    Writes the cleaned data as typed arrays that API workers memory-map at startup.
+    """
+    print(f"...Writing columnar snapshot to {snapshot_path}...")
+    episodes = sorted(episodes, key=lambda ep: ep[0])
+    colors = sorted(colors, key=lambda c: c[0])
+    subjects = sorted(subjects, key=lambda s: s[0])
+    episode_ids = [ep[0] for ep in episodes]
+    color_ids = [c[0] for c in colors]
+    subject_ids = [s[0] for s in subjects]
+    epoch = datetime(1970, 1, 1)
+
+    arrays = {
+        'episode_id': np.array(episode_ids, dtype='<i4'),
+        'season': np.array([ep[2] for ep in episodes], dtype='<i4'),
+        'episode': np.array([ep[3] for ep in episodes], dtype='<i4'),
+        'air_date': np.array(
+            [(datetime.strptime(ep[4], "%Y-%m-%d") - epoch).days if ep[4] else -1 for ep in episodes],
+            dtype='<i4'
+        ),
+        'num_colors': np.array([ep[7] for ep in episodes], dtype='<i4'),
+        'color_id': np.array(color_ids, dtype='<i4'),
+        'subject_id': np.array(subject_ids, dtype='<i4'),
+    }
+    string_columns = {
+        'title': [ep[1] for ep in episodes],
+        'youtube_src': [ep[5] for ep in episodes],
+        'img_src': [ep[6] for ep in episodes],
+        'extra_info': [ep[8] for ep in episodes],
+        'color_name': [c[1] for c in colors],
+        'color_hex': [c[2] for c in colors],
+        'subject_name': [s[1] for s in subjects],
+    }
+    for name, values in string_columns.items():
+        arrays[f'{name}_data'], arrays[f'{name}_offsets'] = _string_column(values)
+    arrays['episode_colors_indptr'], arrays['episode_colors_indices'] = _csr(episode_colors, episode_ids, color_ids)
+    arrays['episode_subjects_indptr'], arrays['episode_subjects_indices'] = _csr(episode_subjects, episode_ids, subject_ids)
+
+    # Offsets depend on the header length, so lay the arrays out relative to
+    # the data section and grow the header until it fits in front of it
+    layout = {}
+    position = 0
+    for name, array in arrays.items():
+        position = -(-position // COLUMNAR_ALIGN) * COLUMNAR_ALIGN
+        layout[name] = position
+        position += array.nbytes
+    data_start = COLUMNAR_ALIGN
+    while True:
+        header = json.dumps({
+            'arrays': {
+                name: {'dtype': array.dtype.str, 'count': int(array.size), 'offset': data_start + layout[name]}
+                for name, array in arrays.items()
+            },
+            'meta': {'generated_at': datetime.utcnow().isoformat(timespec='seconds'), 'change_seq': change_seq},
+        }).encode('utf-8')
+        if 16 + len(header) <= data_start:
+            break
+        data_start = -(-(16 + len(header)) // COLUMNAR_ALIGN) * COLUMNAR_ALIGN
+
+    tmp_path = f"{snapshot_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(COLUMNAR_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.write(b'\0' * (data_start + layout[name] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(tmp_path, snapshot_path)
+    print("...Columnar snapshot written.")
+
+def _indicator(pairs, row_pos, col_pos):
+    """Dense 0/1 episode x item matrix from (episode_id, item_id) pairs."""
+    matrix = np.zeros((len(row_pos), len(col_pos)), dtype=np.int64)
+    links = [(row_pos[r], col_pos[c]) for r, c in pairs if r in row_pos and c in col_pos]
+    if links:
+        rows, cols = zip(*links)
+        matrix[list(rows), list(cols)] = 1
+    return matrix
+
+def _matrix_rows(kind, matrix, row_ids, col_ids, upper=False):
+    """Non-zero cells of a count matrix as (kind, a_id, b_id, count) rows."""
+    if upper:
+        matrix = np.triu(matrix)
+    rows, cols = np.nonzero(matrix)
+    return [(kind, int(row_ids[r]), int(col_ids[c]), int(matrix[r, c])) for r, c in zip(rows, cols)]
+
+def compute_analytics(episodes, colors, subjects, episode_colors, episode_subjects):
+    """
+    Materializes the analytics tables: co-occurrence matrices, per season/year
+    frequencies and distributions, all computed as matrix products over the
+    episode x color and episode x subject indicator matrices.
+    """
+    episode_ids = [ep[0] for ep in episodes]
+    color_ids = np.array(sorted(c[0] for c in colors))
+    subject_ids = np.array(sorted(s[0] for s in subjects))
+    episode_pos = {eid: i for i, eid in enumerate(episode_ids)}
+    X = _indicator(episode_colors, episode_pos, {cid: j for j, cid in enumerate(color_ids)})
+    Y = _indicator(episode_subjects, episode_pos, {sid: j for j, sid in enumerate(subject_ids)})
+
+    cooccurrence = (
+        _matrix_rows('color_color', X.T @ X, color_ids, color_ids, upper=True)
+        + _matrix_rows('color_subject', X.T @ Y, color_ids, subject_ids)
+        + _matrix_rows('subject_subject', Y.T @ Y, subject_ids, subject_ids, upper=True)
+    )
+
+    num_colors = np.array([ep[7] or 0 for ep in episodes], dtype=np.int64)
+    periods = {
+        'season': [ep[2] for ep in episodes],
+        'year': [int(ep[4][:4]) if ep[4] else None for ep in episodes],
+    }
+    period_frequency = []
+    for period, values in periods.items():
+        buckets = sorted({v for v in values if v is not None})
+        # One-hot episode x bucket matrix; episodes without a value are all zero
+        P = _indicator(
+            [(ep_id, v) for ep_id, v in zip(episode_ids, values) if v is not None],
+            episode_pos, {v: k for k, v in enumerate(buckets)}
+        )
+        for item_kind, counts, item_ids in (
+            ('color', P.T @ X, color_ids),
+            ('subject', P.T @ Y, subject_ids),
+            ('episode', P.sum(axis=0)[:, None], [0]),
+            ('num_colors', (P.T @ num_colors)[:, None], [0]),
+        ):
+            period_frequency += [
+                (period, bucket, item_kind, item_id, count)
+                for _, bucket, item_id, count in _matrix_rows(period, counts, buckets, item_ids)
+            ]
+
+    distribution = []
+    for kind, values in (
+        ('num_colors', np.array([ep[7] for ep in episodes if ep[7] is not None], dtype=np.int64)),
+        ('colors_per_episode', X.sum(axis=1)),
+        ('subjects_per_episode', Y.sum(axis=1)),
+    ):
+        value, count = np.unique(values, return_counts=True)
+        distribution += [(kind, int(v), int(c)) for v, c in zip(value, count)]
+
+    return {
+        'analytics_cooccurrence': cooccurrence,
+        'analytics_period_frequency': period_frequency,
+        'analytics_distribution': distribution,
+    }
+
+# --- Change feed (see backend/api/changes.py) ---
+# Reloading replaces the whole dataset, so it is announced as a single entry
+INSERT_RELOAD_QUERY = (
+    "INSERT INTO change_log (seq, entity, entity_id, op, changed_at) "
+    "VALUES (%s, 'catalog', 0, 'reload', %s)"
+)
+
+def append_reload_change(cursor):
+    """Append the reload entry to the MySQL change log, in the caller's transaction."""
+    # init.sql seeds the counter row
+    cursor.execute("UPDATE change_seq SET seq = seq + 1 WHERE id = 1")
+    cursor.execute("SELECT seq FROM change_seq WHERE id = 1")
+    (seq,) = cursor.fetchone()
+    cursor.execute(INSERT_RELOAD_QUERY, (seq, datetime.utcnow()))
+    return seq
+
+def load_mysql_data(color_list, subject_list, episode_list, episode_colors_map, episode_subjects_map, analytics):
+    """
+    Replaces the MySQL data with the cleaned data in one load and appends its
+    reload entry to the change log. Returns that entry's seq, or None if the
+    load failed.
+    """
+    print("...Loading data into MySQL database...")
+    cnx = get_db_connection()
+    if not cnx:
+        return None
+    cursor = cnx.cursor()
+
+    try:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0;")
+        cursor.execute("TRUNCATE TABLE episode_colors;")
+        cursor.execute("TRUNCATE TABLE episode_subjects;")
+        cursor.execute("TRUNCATE TABLE episodes;")
+        cursor.execute("TRUNCATE TABLE colors;")
+        cursor.execute("TRUNCATE TABLE subjects;")
+        for table in ANALYTICS_COLUMNS:
+            cursor.execute(f"TRUNCATE TABLE {table};")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1;")
+        cnx.commit()
+        print("Existing data truncated.")
+
+        insert_color_query = "INSERT INTO colors (id, name, hex) VALUES (%s, %s, %s)"
+        cursor.executemany(insert_color_query, color_list)
+        cnx.commit()
+
+        insert_subject_query = "INSERT INTO subjects (id, name) VALUES (%s, %s)"
+        cursor.executemany(insert_subject_query, subject_list)
+        cnx.commit()
+
+        insert_episode_query = """
+            INSERT INTO episodes (id, title, season, episode, air_date, youtube_src, img_src, num_colors, extra_info)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """
+        cursor.executemany(insert_episode_query, episode_list)
+        cnx.commit()
+
+        insert_ep_color_query = "INSERT INTO episode_colors (episode_id, color_id) VALUES (%s, %s)"
+        cursor.executemany(insert_ep_color_query, episode_colors_map)
+        cnx.commit()
+
+        insert_ep_subject_query = "INSERT INTO episode_subjects (episode_id, subject_id) VALUES (%s, %s)"
+        cursor.executemany(insert_ep_subject_query, episode_subjects_map)
+        cnx.commit()
+
+        for table, rows in analytics.items():
+            cursor.executemany(insert_analytics_query(table, '%s'), rows)
+        seq = append_reload_change(cursor)
+        cnx.commit()
+        return seq
+
+    except mysql.connector.Error as err:
+        print(f"Error during data loading: {err}")
+        cnx.rollback()
+        return None
+    finally:
+        cursor.close()
+        cnx.close()
+
+def next_snapshot_seq(sqlite_snapshot, columnar_snapshot):
+    """
+    Seq of the reload entry of snapshots built without MySQL: one past the
+    latest seq of the snapshots they replace (1 for a first build), so it
+    counts on like change_seq.
+    """
+    seq = 0
+    if sqlite_snapshot and os.path.exists(sqlite_snapshot):
+        cnx = sqlite3.connect(f"file:{os.path.abspath(sqlite_snapshot)}?mode=ro", uri=True)
+        try:
+            row = cnx.execute("SELECT seq FROM change_seq WHERE id = 1").fetchone()
+        except sqlite3.Error:
+            row = None
+        finally:
+            cnx.close()
+        seq = max(seq, row[0] if row else 0)
+    if columnar_snapshot and os.path.exists(columnar_snapshot):
+        with open(columnar_snapshot, 'rb') as f:
+            if f.read(8) == COLUMNAR_MAGIC:
+                (header_len,) = struct.unpack('<Q', f.read(8))
+                seq = max(seq, json.loads(f.read(header_len)).get('meta', {}).get('change_seq', 0))
+    return seq + 1
+
+def run_etl(sqlite_snapshot=None, columnar_snapshot=None, load_mysql=True):
     """
     Main ETL function to orchestrate the process.
+    Optionally also writes a read-only SQLite snapshot to `sqlite_snapshot`
+    and a memory-mappable columnar snapshot to `columnar_snapshot`.
     """
     print("🚀 Starting ETL process...")
 
-    if not create_database_schema():
+    if load_mysql and not create_database_schema():
         return
 
     print("...Extracting data from files...")
@@ -268,62 +624,70 @@ def run_etl():
     pd.DataFrame(episode_subjects_map, columns=['episode_id', 'subject_id']).to_csv(os.path.join(clean_data_dir, "episode_subjects.csv"), index=False)
     print("Cleaned data saved to 'backend/data/clean_data' directory.")
 
-    # --- 3. LOAD ---
-    print("...Loading data into MySQL database...")
-    cnx = get_db_connection()
-    if not cnx:
-        return
-    cursor = cnx.cursor()
-
-    try:
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 0;")
-        cursor.execute("TRUNCATE TABLE episode_colors;")
-        cursor.execute("TRUNCATE TABLE episode_subjects;")
-        cursor.execute("TRUNCATE TABLE episodes;")
-        cursor.execute("TRUNCATE TABLE colors;")
-        cursor.execute("TRUNCATE TABLE subjects;")
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 1;")
-        cnx.commit()
-        print("Existing data truncated.")
-
-        insert_color_query = "INSERT INTO colors (id, name, hex) VALUES (%s, %s, %s)"
-        color_list = [(data['id'], data['name'], data['hex']) for data in all_colors.values()]
-        cursor.executemany(insert_color_query, color_list)
-        cnx.commit()
-
-        insert_subject_query = "INSERT INTO subjects (id, name) VALUES (%s, %s)"
-        subject_list = [(data['id'], name) for name, data in all_subjects.items()]
-        cursor.executemany(insert_subject_query, subject_list)
-        cnx.commit()
-
-        insert_episode_query = """
-            INSERT INTO episodes (id, title, season, episode, air_date, youtube_src, img_src, num_colors, extra_info)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        episode_list = [
-            (ep['id'], ep['title'], ep['season'], ep['episode'], ep['air_date'],
-             ep['youtube_src'], ep['img_src'], ep['num_colors'], ep['extra_info'])
-            for ep in processed_episodes
-        ]
-        cursor.executemany(insert_episode_query, episode_list)
-        cnx.commit()
+    color_list = [(data['id'], data['name'], data['hex']) for data in all_colors.values()]
+    subject_list = [(data['id'], name) for name, data in all_subjects.items()]
+    episode_list = [
+        (int(ep['id']), ep['title'], int(ep['season']), int(ep['episode']), ep['air_date'],
+         ep['youtube_src'], ep['img_src'], int(ep['num_colors']), ep['extra_info'])
+        for ep in processed_episodes
+    ]
 
-        insert_ep_color_query = "INSERT INTO episode_colors (episode_id, color_id) VALUES (%s, %s)"
-        cursor.executemany(insert_ep_color_query, episode_colors_map)
-        cnx.commit()
+    print("...Computing analytics...")
+    analytics = compute_analytics(
+        episode_list, color_list, subject_list, episode_colors_map, episode_subjects_map
+    )
 
-        insert_ep_subject_query = "INSERT INTO episode_subjects (episode_id, subject_id) VALUES (%s, %s)"
-        cursor.executemany(insert_ep_subject_query, episode_subjects_map)
-        cnx.commit()
+    # --- 3. LOAD ---
+    # MySQL first: the snapshots' reload entry takes the seq the load got
+    # from change_seq, so both serve the same numbering to the change feed
+    if load_mysql:
+        snapshot_seq = load_mysql_data(
+            color_list, subject_list, episode_list, episode_colors_map, episode_subjects_map, analytics
+        )
+        if snapshot_seq is None:
+            if sqlite_snapshot or columnar_snapshot:
+                print("Snapshots not written: the MySQL load failed.")
+            return
+    else:
+        snapshot_seq = next_snapshot_seq(sqlite_snapshot, columnar_snapshot)
+
+    if sqlite_snapshot:
+        write_sqlite_snapshot(
+            sqlite_snapshot, color_list, subject_list, episode_list,
+            episode_colors_map, episode_subjects_map, analytics, snapshot_seq
+        )
+    if columnar_snapshot:
+        write_columnar_snapshot(
+            columnar_snapshot, color_list, subject_list, episode_list,
+            episode_colors_map, episode_subjects_map, snapshot_seq
+        )
 
-        print("✅ ETL process completed successfully!")
 
-    except mysql.connector.Error as err:
-        print(f"Error during data loading: {err}")
-        cnx.rollback()
-    finally:
-        cursor.close()
-        cnx.close()
+    print("✅ ETL process completed successfully!")
 
 if __name__ == "__main__":
-    run_etl()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Clean the raw Joy of Painting data and load it.")
+    parser.add_argument(
+        "--sqlite-snapshot", metavar="PATH", default=os.getenv('SQLITE_SNAPSHOT_PATH'),
+        help="also write a read-only SQLite snapshot for the API to this path"
+    )
+    parser.add_argument(
+        "--columnar-snapshot", metavar="PATH", default=os.getenv('COLUMNAR_SNAPSHOT_PATH'),
+        help="also write a memory-mappable columnar snapshot for API workers to this path"
+    )
+    parser.add_argument(
+        "--no-mysql", action="store_true",
+        help="skip loading MySQL (e.g. to only build the snapshot)"
+    )
+    parser.add_argument(
+        "--schema-only", action="store_true",
+        help="only create or upgrade the MySQL schema, without reloading the data"
+    )
+    args = parser.parse_args()
+    if args.schema_only:
+        raise SystemExit(0 if create_database_schema() else 1)
+    run_etl(
+        sqlite_snapshot=args.sqlite_snapshot,
+        columnar_snapshot=args.columnar_snapshot,
+        load_mysql=not args.no_mysql
+    )
\ No newline at end of file